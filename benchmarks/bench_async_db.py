@@ -0,0 +1,146 @@
+"""
+Compare throughput of the sync and async data paths under concurrent load.
+
+A SQLite file stands in for Postgres; every statement is delayed by
+--latency-ms to simulate a network round trip to the database. The sync path
+blocks a threadpool worker for that time, the async path awaits it.
+
+    python -m benchmarks.bench_async_db --concurrency 100 --requests 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("ENVIRONMENT", "test")
+# Both paths share the in-process profile cache, which would hide the database.
+os.environ.setdefault("PROFILE_CACHE_MAX_SIZE", "0")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import await_only
+
+from configs.db import Base, get_async_db, get_db
+from controllers.async_controller import router as async_router
+from controllers.authentication import get_user_from_token
+from controllers.controller import router
+from models.model import Follows, Profile, ProfileInterest
+
+
+def build_app(path: str, pool_size: int, latency: float) -> FastAPI:
+    engine = create_engine(f"sqlite:///{path}", pool_size=pool_size, connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=pool_size)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def delay(*args):
+        time.sleep(latency)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def async_delay(*args):
+        await_only(asyncio.sleep(latency))
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/sync/profiles")
+    app.include_router(async_router, prefix="/async/profiles")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_user_from_token] = lambda: "user0@example.com"
+    return app
+
+
+def seed(path: str, profiles: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Profile), [
+            {
+                "email": f"user{i}@example.com",
+                "username": f"user{i}",
+                "name": f"Name{i}",
+                "surname": f"Surname{i}",
+            }
+            for i in range(profiles)
+        ])
+        connection.execute(insert(ProfileInterest), [
+            {"interest": interest, "username": f"user{i}", "position": position}
+            for i in range(profiles)
+            for position, interest in enumerate(["coding", "reading"])
+        ])
+        connection.execute(insert(Follows), [
+            {"follower": f"user{i}", "followed": "user0"} for i in range(1, min(profiles, 200))
+        ])
+    engine.dispose()
+
+
+async def run_load(app: FastAPI, prefix: str, profiles: int, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i):
+            if i % 2:
+                url = f"{prefix}/profiles/by-username?username=user{random.randrange(profiles)}"
+            else:
+                url = f"{prefix}/profiles/followers?username=user0"
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    # Measure the data path, not the logging.
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.profiles)
+        app = build_app(path, pool_size=args.concurrency, latency=args.latency_ms / 1000)
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency_ms}ms per statement")
+        for prefix in ("/sync", "/async"):
+            result = asyncio.run(run_load(app, prefix, args.profiles, args.requests, args.concurrency))
+            print(f"{prefix[1:]:>6}: {result['throughput']:8.1f} req/s  p50 {result['p50']:7.1f}ms  p95 {result['p95']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
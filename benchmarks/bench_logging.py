@@ -0,0 +1,163 @@
+"""
+Measure the overhead of logging on the hot, cached profile lookups.
+
+Seeds --profiles rows into a scratch schema of a Postgres database and sends
+--requests lookups through the application for each logging setup:
+
+    disabled       logging.disable, the floor
+    queue          the queue handler at INFO, the default
+    queue debug    the queue handler at DEBUG, sampling --sample-rate of requests
+    sync debug     a StreamHandler at DEBUG on the request thread, as before
+
+The setups take turns for --rounds rounds, so that drift affects them alike.
+Records are written to a temporary file, which is removed at the end along
+with the schema.
+
+    python -m benchmarks.bench_logging --requests 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from configs.db import DATABASE_URL, Base, get_db
+from configs.env import settings
+from configs.log import TEXT_FORMAT, configure_logging, stop_logging
+from controllers.authentication import get_user_from_token
+from main import app
+
+SCHEMA = "bench_logging"
+ENDPOINTS = ["/profiles/", "/profiles/by-username?username=user{i}"]
+
+
+def seed(engine, profiles: int):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("""
+            INSERT INTO profiles (email, username, name, surname, is_verified)
+            SELECT 'user' || i || '@example.com', 'user' || i, 'Name' || i, 'Surname' || i, false
+            FROM generate_series(1, :profiles) AS i
+        """), {"profiles": profiles})
+
+
+def use_disabled(path: str):
+    stop_logging()
+    logging.disable(logging.CRITICAL)
+
+
+def use_queue(path: str, level: str = "INFO", sample_rate: float = 1.0):
+    logging.disable(logging.NOTSET)
+    settings.LOG_LEVEL = level
+    settings.LOG_DEBUG_SAMPLE_RATE = sample_rate
+    configure_logging(open(path, "a"))
+
+
+def use_sync_debug(path: str):
+    logging.disable(logging.NOTSET)
+    stop_logging()
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+
+async def measure(client: httpx.AsyncClient, endpoint: str, requests: int, profiles: int) -> list:
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.get(endpoint.format(i=1 + i % profiles))
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return latencies
+
+
+def summarize(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "rps": len(latencies) / sum(latencies),
+    }
+
+
+async def run(args, path: str):
+    setups = {
+        "disabled": use_disabled,
+        "queue": use_queue,
+        "queue debug": lambda path: use_queue(path, "DEBUG", args.sample_rate),
+        "sync debug": use_sync_debug,
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ENDPOINTS:
+            # Warm the profile cache, so that the lookups skip the database.
+            await measure(client, endpoint, args.profiles, args.profiles)
+            latencies = {name: [] for name in setups}
+            for _ in range(args.rounds):
+                for name, setup in setups.items():
+                    setup(path)
+                    latencies[name] += await measure(client, endpoint, args.requests // args.rounds, args.profiles)
+                    stop_logging()
+                    logging.disable(logging.CRITICAL)
+            for name, result in latencies.items():
+                result = summarize(result)
+                print(f"{endpoint.split('?')[0]:>24} {name:>12}: p50 {result['p50']:6.3f}ms  p95 {result['p95']:6.3f}ms  {result['rps']:8.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--profiles", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    # The client logs every request it sends, which is not the server's overhead.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    use_disabled(None)
+
+    engine = create_engine(args.database_url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_bench_db
+    app.dependency_overrides[get_user_from_token] = lambda: "user1@example.com"
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+
+    try:
+        seed(engine, args.profiles)
+        asyncio.run(run(args, path))
+        print(f"Wrote {os.path.getsize(path)} bytes of logs")
+    finally:
+        logging.disable(logging.CRITICAL)
+        app.dependency_overrides.clear()
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
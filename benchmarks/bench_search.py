@@ -0,0 +1,124 @@
+"""
+Compare full text profile search against the ILIKE scan it replaces.
+
+Seeds --profiles rows into a scratch schema of a Postgres database, runs
+random one and two word searches through ProfileRepository.search_profiles_page
+and through an equivalent ILIKE query, and reports their latencies. The
+schema is dropped at the end.
+
+    python -m benchmarks.bench_search --profiles 1000000 --searches 200
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("ENVIRONMENT", "test")
+
+from sqlalchemy import create_engine, or_, text
+from sqlalchemy.orm import Session
+
+from configs.db import DATABASE_URL, Base
+from models.model import Profile
+from repositories.repository import ProfileRepository
+
+SCHEMA = "bench_search"
+
+NAMES = ["john", "jane", "maria", "ahmed", "wei", "olga", "pedro", "yuki", "amara", "liam", "noah", "emma", "sofia", "ivan", "fatima", "lucas"]
+SURNAMES = ["smith", "garcia", "chen", "ivanova", "kowalski", "okafor", "silva", "tanaka", "muller", "rossi", "nguyen", "haddad", "berg", "novak"]
+LOCATIONS = ["new york", "london", "paris", "berlin", "tokyo", "lagos", "lima", "madrid", "warsaw", "seoul", "cairo", "oslo"]
+WORDS = [
+    "developer", "designer", "photographer", "teacher", "runner", "chef", "writer", "musician", "gardener", "climber",
+    "engineer", "painter", "traveler", "reader", "gamer", "baker", "cyclist", "student", "founder", "doctor",
+]
+
+
+def _sql_array(words: list) -> str:
+    return "ARRAY[" + ", ".join(f"'{word}'" for word in words) + "]"
+
+
+def seed(engine, profiles: int):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            INSERT INTO profiles (email, username, name, surname, location, description, is_verified)
+            SELECT
+                'user' || i || '@example.com',
+                'user' || i,
+                initcap(({_sql_array(NAMES)})[1 + i % {len(NAMES)}]),
+                initcap(({_sql_array(SURNAMES)})[1 + (i / 7) % {len(SURNAMES)}]),
+                initcap(({_sql_array(LOCATIONS)})[1 + (i / 3) % {len(LOCATIONS)}]),
+                'Passionate ' || ({_sql_array(WORDS)})[1 + (i * 7919) % {len(WORDS)}]
+                    || ' and ' || ({_sql_array(WORDS)})[1 + (i * 104729) % {len(WORDS)}],
+                i % 10 = 0
+            FROM generate_series(1::bigint, :profiles) AS i
+        """), {"profiles": profiles})
+        connection.execute(text("ANALYZE profiles"))
+
+
+def ilike_search(db: Session, query: str, limit: int):
+    conditions = [
+        or_(*[column.ilike(f"%{word}%") for column in (Profile.name, Profile.surname, Profile.location, Profile.description)])
+        for word in query.split()
+    ]
+    return db.query(Profile).filter(*conditions).order_by(Profile.username).limit(limit).all()
+
+
+def random_query() -> str:
+    terms = [random.choice(NAMES + SURNAMES + WORDS)]
+    if random.random() < 0.5:
+        terms.append(random.choice(LOCATIONS + WORDS))
+    return " ".join(terms)
+
+
+def measure(search, queries: list) -> dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    # Measure the queries, not the logging.
+    logging.disable(logging.CRITICAL)
+
+    engine = create_engine(args.database_url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    try:
+        start = time.perf_counter()
+        seed(engine, args.profiles)
+        print(f"Seeded {args.profiles} profiles in {time.perf_counter() - start:.1f}s")
+
+        queries = [random_query() for _ in range(args.searches)]
+        with Session(engine) as db:
+            searches = {
+                "full text": lambda query: ProfileRepository.search_profiles_page(db, query, None, None, args.limit),
+                "ilike": lambda query: ilike_search(db, query, args.limit),
+            }
+            for name, search in searches.items():
+                result = measure(search, queries)
+                print(f"{name:>9}: p50 {result['p50']:8.2f}ms  p95 {result['p95']:8.2f}ms  ({args.searches} searches, limit {args.limit})")
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
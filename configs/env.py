@@ -5,18 +5,115 @@ load_dotenv()
 
 class Settings():
     AUTH_SERVICE_URL: str
+    AUTH_CACHE_MAX_SIZE: int
+    AUTH_CACHE_TTL: float
+    AUTH_CACHE_NEGATIVE_TTL: float
+    AUTH_CONNECT_TIMEOUT: float
+    AUTH_READ_TIMEOUT: float
+    AUTH_MAX_CONNECTIONS: int
+    AUTH_MAX_KEEPALIVE_CONNECTIONS: int
+    AUTH_BREAKER_FAILURE_THRESHOLD: int
+    AUTH_BREAKER_RESET_TIMEOUT: float
+    AUTH_MODE: str
+    AUTH_JWKS_URL: str
+    AUTH_JWKS_REFRESH_INTERVAL: float
+    AUTH_JWKS_MIN_REFRESH_INTERVAL: float
+    AUTH_JWT_ALGORITHMS: list
+    AUTH_JWT_EMAIL_CLAIM: str
+    AUTH_JWT_AUDIENCE: str
+    AUTH_JWT_ISSUER: str
     DB_USER: str
     DB_PASSWORD: str
     DB_HOST: str
     DB_PORT: str
     DB_NAME: str
+    DB_READ_HOST: str
+    DB_READ_PORT: str
+    DB_READ_YOUR_WRITES_WINDOW: float
+    DB_ASYNC: bool
+    DB_POOL_SIZE: int
+    DB_MAX_OVERFLOW: int
+    DB_POOL_TIMEOUT: float
+    DB_POOL_RECYCLE: int
+    DB_POOL_PRE_PING: bool
+    QUERY_BUDGET: int
+    QUERY_REPEAT_LIMIT: int
+    QUERY_BUDGET_STRICT: bool
+    LOG_LEVEL: str
+    LOG_FORMAT: str
+    LOG_QUEUE_SIZE: int
+    LOG_DEBUG_SAMPLE_RATE: float
+    LOG_DEBUG_ROUTE_SAMPLE_RATES: str
+    PAGE_DEFAULT_LIMIT: int
+    PAGE_MAX_LIMIT: int
+    EXPORT_BATCH_SIZE: int
+    BATCH_MAX_SIZE: int
+    PROFILE_CACHE_MAX_SIZE: int
+    PROFILE_CACHE_TTL: float
+    LEADERBOARD_SIZE: int
+    LEADERBOARD_GROWTH_DAYS: float
+    LEADERBOARD_REFRESH_INTERVAL: float
+    AUTOCOMPLETE_DEFAULT_LIMIT: int
+    AUTOCOMPLETE_MAX_LIMIT: int
 
     def __init__(self):
         self.AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
+        self.AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+        self.AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+        self.AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))
+        self.AUTH_CONNECT_TIMEOUT = float(os.getenv("AUTH_CONNECT_TIMEOUT", "2"))
+        self.AUTH_READ_TIMEOUT = float(os.getenv("AUTH_READ_TIMEOUT", "5"))
+        self.AUTH_MAX_CONNECTIONS = int(os.getenv("AUTH_MAX_CONNECTIONS", "100"))
+        self.AUTH_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AUTH_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.AUTH_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AUTH_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.AUTH_BREAKER_RESET_TIMEOUT = float(os.getenv("AUTH_BREAKER_RESET_TIMEOUT", "30"))
+        self.AUTH_MODE = os.getenv("AUTH_MODE", "remote")
+        self.AUTH_JWKS_URL = os.getenv("AUTH_JWKS_URL", f"{self.AUTH_SERVICE_URL}/.well-known/jwks.json")
+        self.AUTH_JWKS_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_REFRESH_INTERVAL", "300"))
+        self.AUTH_JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("AUTH_JWKS_MIN_REFRESH_INTERVAL", "30"))
+        self.AUTH_JWT_ALGORITHMS = os.getenv("AUTH_JWT_ALGORITHMS", "RS256").split(",")
+        self.AUTH_JWT_EMAIL_CLAIM = os.getenv("AUTH_JWT_EMAIL_CLAIM", "email")
+        self.AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE")
+        self.AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER")
         self.DB_USER = os.getenv("DB_USER")
         self.DB_PASSWORD = os.getenv("DB_PASSWORD")
         self.DB_HOST = os.getenv("DB_HOST")
         self.DB_PORT = os.getenv("DB_PORT")
         self.DB_NAME = os.getenv("DB_NAME")
+        self.DB_READ_HOST = os.getenv("DB_READ_HOST")
+        self.DB_READ_PORT = os.getenv("DB_READ_PORT", self.DB_PORT)
+        self.DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5"))
+        self.DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        self.QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+        self.QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+        self.QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        self.LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))
+        self.LOG_DEBUG_ROUTE_SAMPLE_RATES = os.getenv("LOG_DEBUG_ROUTE_SAMPLE_RATES", "")
+        self.PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+        self.PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+        self.EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+        self.BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+        self.PROFILE_CACHE_MAX_SIZE = int(os.getenv("PROFILE_CACHE_MAX_SIZE", "10000"))
+        self.PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "30"))
+        self.LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "1000"))
+        self.LEADERBOARD_GROWTH_DAYS = float(os.getenv("LEADERBOARD_GROWTH_DAYS", "7"))
+        self.LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "300"))
+        self.AUTOCOMPLETE_DEFAULT_LIMIT = int(os.getenv("AUTOCOMPLETE_DEFAULT_LIMIT", "10"))
+        self.AUTOCOMPLETE_MAX_LIMIT = int(os.getenv("AUTOCOMPLETE_MAX_LIMIT", "50"))
+        self.RECOMMENDATION_DEFAULT_LIMIT = int(os.getenv("RECOMMENDATION_DEFAULT_LIMIT", "10"))
+        self.RECOMMENDATION_MAX_LIMIT = int(os.getenv("RECOMMENDATION_MAX_LIMIT", "100"))
+        self.RECOMMENDATION_CANDIDATES = int(os.getenv("RECOMMENDATION_CANDIDATES", "1000"))
+        self.RECOMMENDATION_CACHE_MAX_SIZE = int(os.getenv("RECOMMENDATION_CACHE_MAX_SIZE", "10000"))
+        self.RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+        self.FOLLOW_GRAPH_RELOAD_INTERVAL = float(os.getenv("FOLLOW_GRAPH_RELOAD_INTERVAL", "900"))
+        self.FOLLOW_GRAPH_SYNC_INTERVAL = float(os.getenv("FOLLOW_GRAPH_SYNC_INTERVAL", "10"))
 
 settings = Settings()
\ No newline at end of file
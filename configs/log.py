@@ -0,0 +1,158 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from configs.env import settings
+from services.metrics import current_request, registry
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+log_records_dropped = registry.counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+_handler = None
+_listener = None
+
+
+def parse_sample_rates(value: str) -> dict:
+    """
+    Get the debug sample rates by route from "GET /profiles/by-username=0.01,POST /profiles/=1".
+    """
+    rates = {}
+    for item in value.split(","):
+        if item.strip():
+            route, _, rate = item.rpartition("=")
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds the method and route of the current request to every record, and
+    samples the DEBUG records of requests: the first one logged after the
+    route is matched decides, at the sample rate of the route, whether all
+    the DEBUG records of the request pass.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, route_sample_rates: dict = None):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.route_sample_rates = route_sample_rates or {}
+
+    def filter(self, record) -> bool:
+        stats = current_request.get()
+        if stats is None or stats.scope is None:
+            record.method = record.route = None
+            return True
+
+        record.method = stats.scope["method"]
+        record.route = stats.route()
+        if record.levelno > logging.DEBUG:
+            return True
+        if stats.debug_sampled is not None:
+            return stats.debug_sampled
+
+        rate = self.route_sample_rates.get(f"{record.method} {record.route}", self.sample_rate)
+        sampled = rate >= 1 or random.random() < rate
+        if "route" in stats.scope:
+            stats.debug_sampled = sampled
+        return sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the request of the record if it has one.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "route", None) is not None:
+            entry["method"] = record.method
+            entry["route"] = record.route
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue for the listener thread to format and
+    write, dropping them instead of blocking the caller when it is full.
+    """
+
+    def prepare(self, record):
+        # Merge the arguments and render the traceback in the caller, while
+        # they still describe the moment of the call; formatting the record
+        # and writing it is left to the listener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class BackgroundQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room on a full queue rather than failing to stop.
+        self.queue.put(self._sentinel)
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """
+    Send the records of every logger at LOG_LEVEL or above through a queue to
+    a background thread writing them to stream, stderr by default, in
+    LOG_FORMAT. Replaces the handlers of the root logger.
+    """
+    global _handler, _listener
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _handler = BackgroundQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    _handler.addFilter(RequestContextFilter(settings.LOG_DEBUG_SAMPLE_RATE, parse_sample_rates(settings.LOG_DEBUG_ROUTE_SAMPLE_RATES)))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = BackgroundQueueListener(_handler.queue, output)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """
+    Write out the queued records and stop the listener thread.
+    """
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _handler = _listener = None
+
+
+atexit.register(stop_logging)
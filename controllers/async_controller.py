@@ -0,0 +1,483 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Literal, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configs.db import get_async_db, get_async_read_db, get_async_write_db
+from schemas.schema import FollowCounts, FollowResult, InterestCount, ProfileCreate, ProfileLookup, ProfileResponse, ProfileSuggestion, Recommendation, UsernameBatch
+from services.async_service import AsyncProfileService
+from configs.env import settings
+import logging
+from controllers.authentication import get_user_from_token
+from controllers.pagination import page_items, page_limit
+from controllers.streaming import async_export_response, async_json_array_stream
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Read-only routes use the read replica, unless the client wrote recently.
+# Profile lookups served through the profile cache stay on the primary, so
+# the cache is never filled from a replica that has not caught up.
+
+@router.post("/")
+async def create_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Create a profile.
+    """
+    logger.debug("Creating profile %s", profile_data.username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.create_profile(db, profile_data, user_email)
+        logger.debug("Profile created successfully")
+        return {"message": "Profile created successfully"}
+                
+    except Exception as e:
+        logger.error("Error creating profile: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=ProfileResponse)
+async def get_profile(user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_db)):
+    """
+    Get a profile.
+    """
+    logger.debug("Getting profile")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profile = await service.get_profile(db, user_email)
+        logger.debug("Profile retrieved successfully")
+        return ProfileResponse(**profile)
+                
+    except Exception as e:
+        logger.error("Error getting profile: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/")
+async def update_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Update a profile.
+    """
+    logger.debug("Updating profile %s", profile_data.username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.update_profile(db, profile_data, user_email)
+        logger.debug("Profile updated successfully")
+        return {"message": "Profile updated successfully"}
+                
+    except Exception as e:
+        logger.error("Error updating profile: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.delete("/")
+async def delete_profile(user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Delete a profile.
+    """
+    logger.debug("Deleting profile")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.delete_profile(db, user_email)
+        logger.debug("Profile deleted successfully")
+        return {"message": "Profile deleted successfully"}
+                
+    except Exception as e:
+        logger.error("Error deleting profile: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/all-usernames")
+async def get_all_usernames(response: Response, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get all usernames.
+    """
+    logger.debug("Getting all usernames")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        usernames = await service.get_all_usernames(db, limit, after)
+        logger.debug("Usernames retrieved successfully")
+        return page_items(response, usernames)
+                
+    except Exception as e:
+        logger.error("Error getting all usernames: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/by-username", response_model=ProfileResponse)
+async def get_profile_by_username(username: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get a profile by username.
+    """
+    logger.debug("Getting profile by username %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profile = await service.get_profile_by_username(db, username)
+        logger.debug("Profile retrieved successfully")
+        return ProfileResponse(**profile)
+                
+    except Exception as e:
+        logger.error("Error getting profile by username: %s", e)
+        raise HTTPException(status_code=404, detail=str(e))
+    
+@router.get("/by-email", response_model=ProfileResponse)
+async def get_profile_by_email(email: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get a profile by email.
+    """
+    logger.debug("Getting profile by email %s", email)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profile = await service.get_profile_by_email(db, email)
+        logger.debug("Profile retrieved successfully")
+        return ProfileResponse(**profile)
+                
+    except Exception as e:
+        logger.error("Error getting profile by email: %s", e)
+        raise HTTPException(status_code=404, detail=str(e))
+    
+@router.get("/counts", response_model=FollowCounts)
+async def get_follow_counts(username: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the number of followers and followed users of a user.
+    """
+    logger.debug("Getting follow counts of %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        counts = await service.get_follow_counts(db, username)
+        logger.debug("Follow counts retrieved successfully")
+        return counts
+
+    except Exception as e:
+        logger.error("Error getting follow counts: %s", e)
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/batch", response_model=List[Optional[ProfileResponse]])
+async def get_profiles_batch(lookup: ProfileLookup, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get profiles by usernames or emails, in the order given and null where not found.
+    """
+    logger.debug("Getting profiles batch")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = await service.get_profiles_batch(db, lookup.usernames, lookup.emails)
+        logger.debug("Profiles batch retrieved successfully")
+        return [ProfileResponse(**profile) if profile else None for profile in profiles]
+
+    except Exception as e:
+        logger.error("Error getting profiles batch: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/follow")
+async def follow_user(username: str, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Follow a user.
+    """
+    logger.debug("Following user %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.follow_user(db, user_email, username)
+        logger.debug("User followed successfully")
+        return {"message": "User followed successfully"}
+                
+    except Exception as e:
+        logger.error("Error following user: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.delete("/unfollow")
+async def unfollow_user(username: str, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Unfollow a user.
+    """
+    logger.debug("Unfollowing user %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.unfollow_user(db, user_email, username)
+        logger.debug("User unfollowed successfully")
+        return {"message": "User unfollowed successfully"}
+                
+    except Exception as e:
+        logger.error("Error unfollowing user: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.post("/follow/batch", response_model=List[FollowResult])
+async def follow_users(batch: UsernameBatch, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Follow several users in one transaction.
+    """
+    logger.debug("Following %s users", len(batch.usernames))
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        results = await service.follow_users(db, user_email, batch.usernames)
+        logger.debug("Batch follow completed")
+        return results
+
+    except Exception as e:
+        logger.error("Error following users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/unfollow/batch", response_model=List[FollowResult])
+async def unfollow_users(batch: UsernameBatch, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Unfollow several users in one transaction.
+    """
+    logger.debug("Unfollowing %s users", len(batch.usernames))
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        results = await service.unfollow_users(db, user_email, batch.usernames)
+        logger.debug("Batch unfollow completed")
+        return results
+
+    except Exception as e:
+        logger.error("Error unfollowing users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/followers")
+async def get_followers(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get followers of a user.
+    """
+    logger.debug("Getting followers for %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        followers = await service.get_followers(db, username, user_email, limit, after)
+        logger.debug("Followers retrieved successfully")
+        return page_items(response, followers)
+                
+    except Exception as e:
+        logger.error("Error getting followers: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.get("/followers-with-time/")
+async def get_followers_with_time(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get followers of a user with the time they followed.
+    """
+    logger.debug("Getting followers with time for %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        followers = await service.get_followers_with_time(db, username, user_email, limit, after)
+        logger.debug("Followers with time retrieved successfully")
+        return page_items(response, followers)
+                
+    except Exception as e:
+        logger.error("Error getting followers with time: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.get("/followed")
+async def get_followed(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get users followed by a user.
+    """
+    logger.debug("Getting followed")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        followed = await service.get_followed(db, username, user_email, limit, after)
+        logger.debug("Followed retrieved successfully")
+        return page_items(response, followed)
+                
+    except Exception as e:
+        logger.error("Error getting followed: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.get("/followed-emails")
+async def get_followed_emails(username: str, user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get emails of users followed by a user.
+    """
+    logger.debug("Getting followed emails")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        followed_emails = await service.get_followed_emails(db, username, user_email)
+        logger.debug("Followed emails retrieved successfully")
+        return StreamingResponse(async_json_array_stream(followed_emails), media_type="application/json")
+                
+    except Exception as e:
+        logger.error("Error getting followed emails: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.get("/recommendations", response_model=List[Recommendation])
+async def get_recommendations(by_interests: bool = False, limit: int = Query(settings.RECOMMENDATION_DEFAULT_LIMIT, ge=1, le=settings.RECOMMENDATION_MAX_LIMIT), user_email: callable = Depends(get_user_from_token), db: AsyncSession = Depends(get_async_db)):
+    """
+    Get users to follow, followed by the most users the user follows.
+    """
+    logger.debug("Getting recommendations")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        recommendations = await service.get_recommendations(db, user_email, by_interests, limit)
+        logger.debug("Recommendations retrieved successfully")
+        return recommendations
+
+    except Exception as e:
+        logger.error("Error getting recommendations: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/verify")
+async def verify_user(username: str, db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Verify a user.
+    """
+    logger.debug("Verifying user %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.verify_user(db, username)
+        logger.debug("User verified successfully")
+        return {"message": "User verified successfully"}
+                
+    except Exception as e:
+        logger.error("Error verifying user: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.put("/unverify")
+async def unverify_user(username: str, db: AsyncSession = Depends(get_async_write_db)):
+    """
+    Unverify a user.
+    """
+    logger.debug("Unverifying user %s", username)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        await service.unverify_user(db, username)
+        logger.debug("User unverified successfully")
+        return {"message": "User unverified successfully"}
+                
+    except Exception as e:
+        logger.error("Error unverifying user: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/get-all-users")
+async def get_all_users(response: Response, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get all users.
+    """
+    logger.debug("Getting all users")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        users = await service.get_all_users(db, limit, after)
+        logger.debug("Users retrieved successfully")
+        return page_items(response, users)
+                
+    except Exception as e:
+        logger.error("Error getting all users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+@router.get("/verified-users")
+async def get_verified_users(response: Response, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get verified users.
+    """
+    logger.debug("Getting verified users")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        users = await service.get_verified_users(db, limit, after)
+        logger.debug("Verified users retrieved successfully")
+        return page_items(response, users)
+                
+    except Exception as e:
+        logger.error("Error getting verified users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/autocomplete", response_model=List[ProfileSuggestion])
+async def autocomplete(prefix: str = Query(min_length=1), limit: int = Query(settings.AUTOCOMPLETE_DEFAULT_LIMIT, ge=1, le=settings.AUTOCOMPLETE_MAX_LIMIT), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get profiles whose username, name or surname starts with a prefix.
+    """
+    logger.debug("Autocompleting %s", prefix)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        suggestions = await service.autocomplete(db, prefix, limit)
+        logger.debug("Autocomplete suggestions retrieved successfully")
+        return suggestions
+
+    except Exception as e:
+        logger.error("Error autocompleting: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search", response_model=List[ProfileResponse])
+async def search_profiles(response: Response, q: str = Query(min_length=1), verified: bool = None, location: str = None, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Search profiles by name, location and description, most relevant first.
+    """
+    logger.debug("Searching profiles for %s", q)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = await service.search_profiles(db, q, verified, location, limit, after)
+        logger.debug("Profile search results retrieved successfully")
+        return page_items(response, profiles)
+
+    except Exception as e:
+        logger.error("Error searching profiles: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/by-interest", response_model=List[ProfileResponse])
+async def get_profiles_by_interest(interest: str, response: Response, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get profiles with an interest.
+    """
+    logger.debug("Getting profiles with interest %s", interest)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = await service.get_profiles_by_interest(db, interest, limit, after)
+        logger.debug("Profiles with interest retrieved successfully")
+        return page_items(response, profiles)
+
+    except Exception as e:
+        logger.error("Error getting profiles by interest: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/interests/popular", response_model=List[InterestCount])
+async def get_popular_interests(limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get the most popular interests with their number of profiles.
+    """
+    logger.debug("Getting popular interests")
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        interests = await service.get_popular_interests(db, limit)
+        logger.debug("Popular interests retrieved successfully")
+        return interests
+
+    except Exception as e:
+        logger.error("Error getting popular interests: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/leaderboard")
+async def get_leaderboard(response: Response, board: Literal["followers", "growth"] = "followers", verified: bool = False, after: str = None, limit: int = Depends(page_limit), db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get the most followed or fastest growing users, optionally verified only.
+    """
+    logger.debug("Getting %s leaderboard", board)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        entries = await service.get_leaderboard(db, board, verified, limit, after)
+        logger.debug("Leaderboard retrieved successfully")
+        return page_items(response, entries)
+
+    except Exception as e:
+        logger.error("Error getting leaderboard: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export/profiles")
+async def export_profiles(format: Literal["ndjson", "csv"] = "ndjson", db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Export all profiles as NDJSON or CSV, streamed in batches.
+    """
+    logger.debug("Exporting profiles as %s", format)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = await service.export_profiles(db, settings.EXPORT_BATCH_SIZE)
+        return async_export_response(profiles, format, "profiles", settings.EXPORT_BATCH_SIZE)
+
+    except Exception as e:
+        logger.error("Error exporting profiles: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export/follows")
+async def export_follows(format: Literal["ndjson", "csv"] = "ndjson", db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Export all follows as NDJSON or CSV, streamed in batches.
+    """
+    logger.debug("Exporting follows as %s", format)
+    service = AsyncProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        follows = await service.export_follows(db, settings.EXPORT_BATCH_SIZE)
+        return async_export_response(follows, format, "follows", settings.EXPORT_BATCH_SIZE)
+
+    except Exception as e:
+        logger.error("Error exporting follows: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,23 +1,99 @@
 from fastapi import HTTPException, Header
-import requests
 import logging
+import time
 from configs.env import settings
+from services.auth_client import AuthClient, AuthServiceUnavailableError, CircuitBreaker, InvalidTokenError
+from services.cache import TTLCache
+from services.jwt_verifier import JWKSCache, LocalTokenVerifier
+from services.metrics import auth_service_duration, observe_auth
+from services.singleflight import AsyncSingleFlight
 
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def get_user_from_token(token: str = Header(None)) -> str:
+# Maps token -> email. Invalid tokens are cached as None for a shorter time.
+token_cache = TTLCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL)
+_NOT_CACHED = object()
+
+# Concurrent lookups of the same token share one auth service call.
+token_lookups = AsyncSingleFlight()
+
+auth_client = AuthClient(
+    base_url=settings.AUTH_SERVICE_URL,
+    connect_timeout=settings.AUTH_CONNECT_TIMEOUT,
+    read_timeout=settings.AUTH_READ_TIMEOUT,
+    max_connections=settings.AUTH_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.AUTH_MAX_KEEPALIVE_CONNECTIONS,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.AUTH_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.AUTH_BREAKER_RESET_TIMEOUT,
+    ),
+)
+
+# In "local" mode signed tokens are verified in-process and the auth service
+# is only asked about tokens that cannot be verified with the cached keys.
+token_verifier = None
+if settings.AUTH_MODE == "local":
+    token_verifier = LocalTokenVerifier(
+        jwks=JWKSCache(
+            fetch_jwks=lambda: auth_client.get_json(settings.AUTH_JWKS_URL),
+            refresh_interval=settings.AUTH_JWKS_REFRESH_INTERVAL,
+            min_refresh_interval=settings.AUTH_JWKS_MIN_REFRESH_INTERVAL,
+        ),
+        algorithms=settings.AUTH_JWT_ALGORITHMS,
+        email_claim=settings.AUTH_JWT_EMAIL_CLAIM,
+        audience=settings.AUTH_JWT_AUDIENCE,
+        issuer=settings.AUTH_JWT_ISSUER,
+    )
+
+async def get_user_from_token(token: str = Header(None)) -> str:
         """
         This function gets the user from the token.
         """
-        logger.info(f"Getting user email from token {token}")
-        response = requests.get(
-            settings.AUTH_SERVICE_URL + "/auth/get-email-from-token",
-            headers={"Content-Type": "application/json"},
-            json={"token": token}
-        )
-        if response.status_code == 200:
-            logger.info(f"User email: {response.json().get('email')}")
-            return response.json().get("email")
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        start = time.perf_counter()
+        try:
+            return await _get_user_from_token(token)
+        finally:
+            observe_auth(time.perf_counter() - start)
+
+async def _get_user_from_token(token: str) -> str:
+        if token_verifier is not None:
+            try:
+                email = await token_verifier.get_email(token)
+            except InvalidTokenError:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            if email is not None:
+                return email
+
+        cached_email = token_cache.get(token, _NOT_CACHED)
+        if cached_email is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if cached_email is not _NOT_CACHED:
+            return cached_email
+
+        try:
+            return await token_lookups.do(token, lambda: _lookup_email(token))
+        except InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        except AuthServiceUnavailableError as e:
+            logger.error("Auth service unavailable: %s", e)
+            raise HTTPException(status_code=503, detail="Authentication service unavailable")
+
+async def _lookup_email(token: str) -> str:
+        """
+        Ask the auth service for the email of a token and cache the answer.
+        """
+        logger.debug("Getting user email from token")
+        start = time.perf_counter()
+        try:
+            email = await auth_client.get_email_from_token(token)
+        except InvalidTokenError:
+            token_cache.set(token, None, ttl=settings.AUTH_CACHE_NEGATIVE_TTL)
+            raise
+        finally:
+            auth_service_duration.observe((), time.perf_counter() - start)
+
+        logger.debug("User email: %s", email)
+        if email is not None:
+            token_cache.set(token, email)
+        return email
@@ -1,33 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Literal, Optional
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from configs.db import get_db
-from schemas.schema import ProfileCreate, ProfileResponse
+from configs.db import get_db, get_read_db, get_write_db
+from schemas.schema import FollowCounts, FollowResult, InterestCount, ProfileCreate, ProfileLookup, ProfileResponse, ProfileSuggestion, Recommendation, UsernameBatch
 from services.service import ProfileService
 from configs.env import settings
 import logging
 from controllers.authentication import get_user_from_token
+from controllers.pagination import page_items, page_limit
+from controllers.streaming import export_response, json_array_stream
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Read-only routes use the read replica, unless the client wrote recently.
+# Profile lookups served through the profile cache stay on the primary, so
+# the cache is never filled from a replica that has not caught up.
+
 @router.post("/")
-def create_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def create_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
     """
     Create a profile.
     """
-    logger.info(f"Creating profile with data {profile_data.model_dump()}")
+    logger.debug("Creating profile %s", profile_data.username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Creating profile with data {profile_data.model_dump()}")
         service.create_profile(db, profile_data, user_email)
-        logger.info(f"Profile created successfully")
+        logger.debug("Profile created successfully")
         return {"message": "Profile created successfully"}
                 
     except Exception as e:
-        logger.error(f"Error creating profile: {str(e)}")
+        logger.error("Error creating profile: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=ProfileResponse)
@@ -35,67 +41,63 @@ def get_profile(user_email: callable = Depends(get_user_from_token), db: Session
     """
     Get a profile.
     """
-    logger.info(f"Getting profile")
+    logger.debug("Getting profile")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting profile")
         profile = service.get_profile(db, user_email)
-        logger.info(f"Profile retrieved successfully")
+        logger.debug("Profile retrieved successfully")
         return ProfileResponse(**profile)
                 
     except Exception as e:
-        logger.error(f"Error getting profile: {str(e)}")
+        logger.error("Error getting profile: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/")
-def update_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def update_profile(profile_data: ProfileCreate, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
     """
     Update a profile.
     """
-    logger.info(f"Updating profile with data {profile_data.model_dump()}")
+    logger.debug("Updating profile %s", profile_data.username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Updating profile with data {profile_data.model_dump()}")
         service.update_profile(db, profile_data, user_email)
-        logger.info(f"Profile updated successfully")
+        logger.debug("Profile updated successfully")
         return {"message": "Profile updated successfully"}
                 
     except Exception as e:
-        logger.error(f"Error updating profile: {str(e)}")
+        logger.error("Error updating profile: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.delete("/")
-def delete_profile(user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def delete_profile(user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
     """
     Delete a profile.
     """
-    logger.info(f"Deleting profile")
+    logger.debug("Deleting profile")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Deleting profile")
         service.delete_profile(db, user_email)
-        logger.info(f"Profile deleted successfully")
+        logger.debug("Profile deleted successfully")
         return {"message": "Profile deleted successfully"}
                 
     except Exception as e:
-        logger.error(f"Error deleting profile: {str(e)}")
+        logger.error("Error deleting profile: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/all-usernames")
-def get_all_usernames(db: Session = Depends(get_db)):
+def get_all_usernames(response: Response, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
     """
     Get all usernames.
     """
-    logger.info(f"Getting all usernames")
+    logger.debug("Getting all usernames")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting all usernames")
-        usernames = service.get_all_usernames(db)
-        logger.info(f"Usernames retrieved successfully")
-        return usernames
+        usernames = service.get_all_usernames(db, limit, after)
+        logger.debug("Usernames retrieved successfully")
+        return page_items(response, usernames)
                 
     except Exception as e:
-        logger.error(f"Error getting all usernames: {str(e)}")
+        logger.error("Error getting all usernames: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/by-username", response_model=ProfileResponse)
@@ -103,19 +105,15 @@ def get_profile_by_username(username: str, db: Session = Depends(get_db)):
     """
     Get a profile by username.
     """
-    logger.info(f"Getting profile by username {username}")
+    logger.debug("Getting profile by username %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting profile by username {username}")
         profile = service.get_profile_by_username(db, username)
-        logger.info(f"Profile retrieved successfully")
-
-        print("profile", profile)
-
+        logger.debug("Profile retrieved successfully")
         return ProfileResponse(**profile)
                 
     except Exception as e:
-        logger.error(f"Error getting profile by username: {str(e)}")
+        logger.error("Error getting profile by username: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     
 @router.get("/by-email", response_model=ProfileResponse)
@@ -123,191 +121,363 @@ def get_profile_by_email(email: str, db: Session = Depends(get_db)):
     """
     Get a profile by email.
     """
-    logger.info(f"Getting profile by email {email}")
+    logger.debug("Getting profile by email %s", email)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting profile by email {email}")
         profile = service.get_profile_by_email(db, email)
-        logger.info(f"Profile retrieved successfully")
+        logger.debug("Profile retrieved successfully")
         return ProfileResponse(**profile)
                 
     except Exception as e:
-        logger.error(f"Error getting profile by email: {str(e)}")
+        logger.error("Error getting profile by email: %s", e)
         raise HTTPException(status_code=404, detail=str(e))
     
+@router.get("/counts", response_model=FollowCounts)
+def get_follow_counts(username: str, db: Session = Depends(get_db)):
+    """
+    Get the number of followers and followed users of a user.
+    """
+    logger.debug("Getting follow counts of %s", username)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        counts = service.get_follow_counts(db, username)
+        logger.debug("Follow counts retrieved successfully")
+        return counts
+
+    except Exception as e:
+        logger.error("Error getting follow counts: %s", e)
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/batch", response_model=List[Optional[ProfileResponse]])
+def get_profiles_batch(lookup: ProfileLookup, db: Session = Depends(get_read_db)):
+    """
+    Get profiles by usernames or emails, in the order given and null where not found.
+    """
+    logger.debug("Getting profiles batch")
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = service.get_profiles_batch(db, lookup.usernames, lookup.emails)
+        logger.debug("Profiles batch retrieved successfully")
+        return [ProfileResponse(**profile) if profile else None for profile in profiles]
+
+    except Exception as e:
+        logger.error("Error getting profiles batch: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/follow")
-def follow_user(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def follow_user(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
     """
     Follow a user.
     """
-    logger.info(f"Following user {username}")
+    logger.debug("Following user %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Following user {username}")
         service.follow_user(db, user_email, username)
-        logger.info(f"User followed successfully")
+        logger.debug("User followed successfully")
         return {"message": "User followed successfully"}
                 
     except Exception as e:
-        logger.error(f"Error following user: {str(e)}")
+        logger.error("Error following user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.delete("/unfollow")
-def unfollow_user(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def unfollow_user(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
     """
     Unfollow a user.
     """
-    logger.info(f"Unfollowing user {username}")
+    logger.debug("Unfollowing user %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Unfollowing user {username}")
         service.unfollow_user(db, user_email, username)
-        logger.info(f"User unfollowed successfully")
+        logger.debug("User unfollowed successfully")
         return {"message": "User unfollowed successfully"}
                 
     except Exception as e:
-        logger.error(f"Error unfollowing user: {str(e)}")
+        logger.error("Error unfollowing user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
+@router.post("/follow/batch", response_model=List[FollowResult])
+def follow_users(batch: UsernameBatch, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
+    """
+    Follow several users in one transaction.
+    """
+    logger.debug("Following %s users", len(batch.usernames))
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        results = service.follow_users(db, user_email, batch.usernames)
+        logger.debug("Batch follow completed")
+        return results
+
+    except Exception as e:
+        logger.error("Error following users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/unfollow/batch", response_model=List[FollowResult])
+def unfollow_users(batch: UsernameBatch, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_write_db)):
+    """
+    Unfollow several users in one transaction.
+    """
+    logger.debug("Unfollowing %s users", len(batch.usernames))
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        results = service.unfollow_users(db, user_email, batch.usernames)
+        logger.debug("Batch unfollow completed")
+        return results
+
+    except Exception as e:
+        logger.error("Error unfollowing users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/followers")
-def get_followers(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def get_followers(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_read_db)):
     """
     Get followers of a user.
     """
-    logger.info(f"Getting followers for {username}")
+    logger.debug("Getting followers for %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting followers for {username}")
-        followers = service.get_followers(db, username, user_email)
-        logger.info(f"Followers retrieved successfully")
-        return followers
+        followers = service.get_followers(db, username, user_email, limit, after)
+        logger.debug("Followers retrieved successfully")
+        return page_items(response, followers)
                 
     except Exception as e:
-        logger.error(f"Error getting followers: {str(e)}")
+        logger.error("Error getting followers: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.get("/followers-with-time/")
-def get_followers_with_time(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def get_followers_with_time(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_read_db)):
     """
     Get followers of a user with the time they followed.
     """
-    logger.info(f"Getting followers with time for {username}")
+    logger.debug("Getting followers with time for %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting followers with time for {username}")
-        followers = service.get_followers_with_time(db, username, user_email)
-        logger.info(f"Followers with time retrieved successfully")
-        return followers
+        followers = service.get_followers_with_time(db, username, user_email, limit, after)
+        logger.debug("Followers with time retrieved successfully")
+        return page_items(response, followers)
                 
     except Exception as e:
-        logger.error(f"Error getting followers with time: {str(e)}")
+        logger.error("Error getting followers with time: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.get("/followed")
-def get_followed(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def get_followed(username: str, response: Response, after: str = None, limit: int = Depends(page_limit), user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_read_db)):
     """
     Get users followed by a user.
     """
-    logger.info(f"Getting followed")
+    logger.debug("Getting followed")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting followed")
-        followed = service.get_followed(db, username, user_email)
-        logger.info(f"Followed retrieved successfully")
-        return followed
+        followed = service.get_followed(db, username, user_email, limit, after)
+        logger.debug("Followed retrieved successfully")
+        return page_items(response, followed)
                 
     except Exception as e:
-        logger.error(f"Error getting followed: {str(e)}")
+        logger.error("Error getting followed: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.get("/followed-emails")
-def get_followed_emails(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+def get_followed_emails(username: str, user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_read_db)):
     """
     Get emails of users followed by a user.
     """
-    logger.info(f"Getting followed emails")
+    logger.debug("Getting followed emails")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting followed emails")
-        followed_usernames = service.get_followed(db, username, user_email)
-        logger.info(f"Followed emails retrieved successfully")
-        followed_emails = []
-        for followed_username in followed_usernames:
-            followed_profile = service.get_profile_by_username(db, followed_username)
-            followed_emails.append(followed_profile["email"])
-        return followed_emails
+        followed_emails = service.get_followed_emails(db, username, user_email)
+        logger.debug("Followed emails retrieved successfully")
+        return StreamingResponse(json_array_stream(followed_emails), media_type="application/json")
                 
     except Exception as e:
-        logger.error(f"Error getting followed emails: {str(e)}")
+        logger.error("Error getting followed emails: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
+@router.get("/recommendations", response_model=List[Recommendation])
+def get_recommendations(by_interests: bool = False, limit: int = Query(settings.RECOMMENDATION_DEFAULT_LIMIT, ge=1, le=settings.RECOMMENDATION_MAX_LIMIT), user_email: callable = Depends(get_user_from_token), db: Session = Depends(get_db)):
+    """
+    Get users to follow, followed by the most users the user follows.
+    """
+    logger.debug("Getting recommendations")
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        recommendations = service.get_recommendations(db, user_email, by_interests, limit)
+        logger.debug("Recommendations retrieved successfully")
+        return recommendations
+
+    except Exception as e:
+        logger.error("Error getting recommendations: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/verify")
-def verify_user(username: str, db: Session = Depends(get_db)):
+def verify_user(username: str, db: Session = Depends(get_write_db)):
     """
     Verify a user.
     """
-    logger.info(f"Verifying user {username}")
+    logger.debug("Verifying user %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Verifying user {username}")
         service.verify_user(db, username)
-        logger.info(f"User verified successfully")
+        logger.debug("User verified successfully")
         return {"message": "User verified successfully"}
                 
     except Exception as e:
-        logger.error(f"Error verifying user: {str(e)}")
+        logger.error("Error verifying user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.put("/unverify")
-def unverify_user(username: str, db: Session = Depends(get_db)):
+def unverify_user(username: str, db: Session = Depends(get_write_db)):
     """
     Unverify a user.
     """
-    logger.info(f"Unverifying user {username}")
+    logger.debug("Unverifying user %s", username)
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Unverifying user {username}")
         service.unverify_user(db, username)
-        logger.info(f"User unverified successfully")
+        logger.debug("User unverified successfully")
         return {"message": "User unverified successfully"}
                 
     except Exception as e:
-        logger.error(f"Error unverifying user: {str(e)}")
+        logger.error("Error unverifying user: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/get-all-users")
-def get_all_users(db: Session = Depends(get_db)):
+def get_all_users(response: Response, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
     """
     Get all users.
     """
-    logger.info(f"Getting all users")
+    logger.debug("Getting all users")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting all users")
-        users = service.get_all_users(db)
-        logger.info(f"Users retrieved successfully")
-        return users
+        users = service.get_all_users(db, limit, after)
+        logger.debug("Users retrieved successfully")
+        return page_items(response, users)
                 
     except Exception as e:
-        logger.error(f"Error getting all users: {str(e)}")
+        logger.error("Error getting all users: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.get("/verified-users")
-def get_verified_users(db: Session = Depends(get_db)):
+def get_verified_users(response: Response, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
     """
     Get verified users.
     """
-    logger.info(f"Getting verified users")
+    logger.debug("Getting verified users")
     service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
     try:
-        logger.info(f"Getting verified users")
-        users = service.get_verified_users(db)
-        logger.info(f"Verified users retrieved successfully")
-        return users
+        users = service.get_verified_users(db, limit, after)
+        logger.debug("Verified users retrieved successfully")
+        return page_items(response, users)
                 
     except Exception as e:
-        logger.error(f"Error getting verified users: {str(e)}")
+        logger.error("Error getting verified users: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/autocomplete", response_model=List[ProfileSuggestion])
+def autocomplete(prefix: str = Query(min_length=1), limit: int = Query(settings.AUTOCOMPLETE_DEFAULT_LIMIT, ge=1, le=settings.AUTOCOMPLETE_MAX_LIMIT), db: Session = Depends(get_read_db)):
+    """
+    Get profiles whose username, name or surname starts with a prefix.
+    """
+    logger.debug("Autocompleting %s", prefix)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        suggestions = service.autocomplete(db, prefix, limit)
+        logger.debug("Autocomplete suggestions retrieved successfully")
+        return suggestions
+
+    except Exception as e:
+        logger.error("Error autocompleting: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search", response_model=List[ProfileResponse])
+def search_profiles(response: Response, q: str = Query(min_length=1), verified: bool = None, location: str = None, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
+    """
+    Search profiles by name, location and description, most relevant first.
+    """
+    logger.debug("Searching profiles for %s", q)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = service.search_profiles(db, q, verified, location, limit, after)
+        logger.debug("Profile search results retrieved successfully")
+        return page_items(response, profiles)
+
+    except Exception as e:
+        logger.error("Error searching profiles: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/by-interest", response_model=List[ProfileResponse])
+def get_profiles_by_interest(interest: str, response: Response, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
+    """
+    Get profiles with an interest.
+    """
+    logger.debug("Getting profiles with interest %s", interest)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = service.get_profiles_by_interest(db, interest, limit, after)
+        logger.debug("Profiles with interest retrieved successfully")
+        return page_items(response, profiles)
+
+    except Exception as e:
+        logger.error("Error getting profiles by interest: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/interests/popular", response_model=List[InterestCount])
+def get_popular_interests(limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
+    """
+    Get the most popular interests with their number of profiles.
+    """
+    logger.debug("Getting popular interests")
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        interests = service.get_popular_interests(db, limit)
+        logger.debug("Popular interests retrieved successfully")
+        return interests
+
+    except Exception as e:
+        logger.error("Error getting popular interests: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/leaderboard")
+def get_leaderboard(response: Response, board: Literal["followers", "growth"] = "followers", verified: bool = False, after: str = None, limit: int = Depends(page_limit), db: Session = Depends(get_read_db)):
+    """
+    Get the most followed or fastest growing users, optionally verified only.
+    """
+    logger.debug("Getting %s leaderboard", board)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        entries = service.get_leaderboard(db, board, verified, limit, after)
+        logger.debug("Leaderboard retrieved successfully")
+        return page_items(response, entries)
+
+    except Exception as e:
+        logger.error("Error getting leaderboard: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/export/profiles")
+def export_profiles(format: Literal["ndjson", "csv"] = "ndjson", db: Session = Depends(get_read_db)):
+    """
+    Export all profiles as NDJSON or CSV, streamed in batches.
+    """
+    logger.debug("Exporting profiles as %s", format)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        profiles = service.export_profiles(db, settings.EXPORT_BATCH_SIZE)
+        return export_response(profiles, format, "profiles", settings.EXPORT_BATCH_SIZE)
+
+    except Exception as e:
+        logger.error("Error exporting profiles: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/export/follows")
+def export_follows(format: Literal["ndjson", "csv"] = "ndjson", db: Session = Depends(get_read_db)):
+    """
+    Export all follows as NDJSON or CSV, streamed in batches.
+    """
+    logger.debug("Exporting follows as %s", format)
+    service = ProfileService(auth_service_url=settings.AUTH_SERVICE_URL)
+    try:
+        follows = service.export_follows(db, settings.EXPORT_BATCH_SIZE)
+        return export_response(follows, format, "follows", settings.EXPORT_BATCH_SIZE)
 
+    except Exception as e:
+        logger.error("Error exporting follows: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,81 @@
+import time
+
+from services.metrics import RequestStats, current_request, registry
+from services.query_budget import query_budget
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+requests_total = registry.counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+request_errors = registry.counter("http_request_errors_total", "HTTP requests that failed with a server error.", ("method", "route"))
+request_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency, until the response body is sent.", ("method", "route"))
+request_queries = registry.histogram("http_request_db_queries", "Database statements per HTTP request.", ("method", "route"), QUERY_BUCKETS)
+request_query_duration = registry.histogram("http_request_db_seconds", "Database time per HTTP request.", ("method", "route"))
+request_auth_duration = registry.histogram("http_request_auth_seconds", "Authentication time per authenticated HTTP request.", ("method", "route"))
+request_budget_exceeded = registry.counter("http_request_query_budget_exceeded_total", "HTTP requests over their query budget or repeating a statement.", ("method", "route"))
+
+pool_metrics = {
+    "checked_out": registry.gauge("db_pool_checked_out", "Connections checked out of the pool.", ("engine",)),
+    "overflow": registry.gauge("db_pool_overflow", "Connections open beyond the pool size.", ("engine",)),
+    "idle": registry.gauge("db_pool_idle", "Connections idle in the pool.", ("engine",)),
+    "checkouts": registry.counter("db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",)),
+    "timeouts": registry.counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", ("engine",)),
+    "wait_seconds": registry.counter("db_pool_wait_seconds_total", "Time spent waiting for connections.", ("engine",)),
+}
+
+
+def record_pool_stats(pool_stats: dict):
+    """
+    Copy the connection pool telemetry of each engine into the pool metrics.
+    """
+    for engine, stats in pool_stats.items():
+        for key, metric in pool_metrics.items():
+            metric.set((engine,), stats[key])
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording the count, latency, database statements and
+    authentication time of every request, by route template so that path
+    and query values don't multiply the series. Successful requests are
+    then checked against their query budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            current_request.reset(token)
+            labels = (scope["method"], stats.route())
+            request_duration.observe(labels, time.perf_counter() - start)
+            requests_total.inc(labels + (str(status),))
+            if status >= 500:
+                request_errors.inc(labels)
+            request_queries.observe(labels, stats.queries)
+            request_query_duration.observe(labels, stats.query_seconds)
+            if stats.auth_seconds is not None:
+                request_auth_duration.observe(labels, stats.auth_seconds)
+
+        if query_budget.check(*labels, stats.queries, stats.statements):
+            request_budget_exceeded.inc(labels)
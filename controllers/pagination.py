@@ -0,0 +1,22 @@
+from fastapi import Query, Response
+
+from configs.env import settings
+from repositories.pagination import Page
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_limit(limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT)) -> int:
+    """
+    Dependency for the page size of list endpoints.
+    """
+    return limit
+
+
+def page_items(response: Response, page: Page) -> list:
+    """
+    Set the next page cursor header and return the items of a page.
+    """
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
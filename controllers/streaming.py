@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _batches(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _async_batches(items, size: int):
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_array_stream(items, chunk_size: int = 1000):
+    """
+    Encode an iterable as a JSON array, yielding it in chunks of items.
+    """
+    yield "["
+    separator = ""
+    for batch in _batches(items, chunk_size):
+        yield separator + ",".join(json.dumps(item, default=str) for item in batch)
+        separator = ","
+    yield "]"
+
+
+async def async_json_array_stream(items, chunk_size: int = 1000):
+    """
+    Encode an async iterable as a JSON array, yielding it in chunks of items.
+    """
+    yield "["
+    separator = ""
+    async for batch in _async_batches(items, chunk_size):
+        yield separator + ",".join(json.dumps(item, default=str) for item in batch)
+        separator = ","
+    yield "]"
+
+
+def _ndjson_lines(batch: list) -> str:
+    return "".join(json.dumps(dict(row), default=str) + "\n" for row in batch)
+
+
+def _csv_rows(batch: list, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(batch[0].keys()), extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for row in batch:
+        writer.writerow({key: ",".join(value) if isinstance(value, list) else value for key, value in row.items()})
+    return buffer.getvalue()
+
+
+def ndjson_stream(rows, chunk_size: int = 1000):
+    """
+    Encode an iterable of mappings as newline-delimited JSON, in chunks of rows.
+    """
+    for batch in _batches(rows, chunk_size):
+        yield _ndjson_lines(batch)
+
+
+async def async_ndjson_stream(rows, chunk_size: int = 1000):
+    """
+    Encode an async iterable of mappings as newline-delimited JSON, in chunks of rows.
+    """
+    async for batch in _async_batches(rows, chunk_size):
+        yield _ndjson_lines(batch)
+
+
+def csv_stream(rows, chunk_size: int = 1000):
+    """
+    Encode an iterable of mappings as CSV, in chunks of rows. The header is
+    taken from the keys of the first row.
+    """
+    header = True
+    for batch in _batches(rows, chunk_size):
+        yield _csv_rows(batch, header)
+        header = False
+
+
+async def async_csv_stream(rows, chunk_size: int = 1000):
+    """
+    Encode an async iterable of mappings as CSV, in chunks of rows. The header
+    is taken from the keys of the first row.
+    """
+    header = True
+    async for batch in _async_batches(rows, chunk_size):
+        yield _csv_rows(batch, header)
+        header = False
+
+
+def _export_headers(name: str, format: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+
+
+def export_response(rows, format: str, name: str, chunk_size: int) -> StreamingResponse:
+    """
+    Stream rows as an NDJSON or CSV file download.
+    """
+    stream = ndjson_stream(rows, chunk_size) if format == "ndjson" else csv_stream(rows, chunk_size)
+    return StreamingResponse(stream, media_type=EXPORT_MEDIA_TYPES[format], headers=_export_headers(name, format))
+
+
+def async_export_response(rows, format: str, name: str, chunk_size: int) -> StreamingResponse:
+    """
+    Stream async rows as an NDJSON or CSV file download.
+    """
+    stream = async_ndjson_stream(rows, chunk_size) if format == "ndjson" else async_csv_stream(rows, chunk_size)
+    return StreamingResponse(stream, media_type=EXPORT_MEDIA_TYPES[format], headers=_export_headers(name, format))
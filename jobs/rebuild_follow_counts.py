@@ -0,0 +1,29 @@
+"""
+Rebuild the follower and following counters of every profile from follows.
+
+The follow and unfollow statements keep the counters up to date; run this
+after a backfill, a manual edit of follows or to check for drift:
+
+    python -m jobs.rebuild_follow_counts
+"""
+import logging
+
+from configs.db import SessionLocal
+from configs.log import configure_logging
+from repositories.repository import ProfileRepository
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    db = SessionLocal()
+    try:
+        repaired = ProfileRepository.rebuild_follow_counts(db)
+        logger.info("Repaired follow counts of %s profiles", len(repaired))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,31 @@
+"""
+Rebuild the most followed and fastest growing leaderboards.
+
+The application refreshes them every LEADERBOARD_REFRESH_INTERVAL seconds;
+with the interval set to 0 run this from a scheduler instead:
+
+    python -m jobs.refresh_leaderboard
+"""
+import datetime
+import logging
+
+from configs.db import SessionLocal
+from configs.env import settings
+from configs.log import configure_logging
+from repositories.repository import ProfileRepository
+
+logger = logging.getLogger(__name__)
+
+
+def refresh():
+    growth_since = datetime.datetime.now() - datetime.timedelta(days=settings.LEADERBOARD_GROWTH_DAYS)
+    db = SessionLocal()
+    try:
+        ProfileRepository.refresh_leaderboard(db, settings.LEADERBOARD_SIZE, growth_since)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    refresh()
@@ -1,15 +1,69 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from controllers.controller import router
-from configs.db import Base, engine
+from controllers.async_controller import router as async_router
+from controllers.authentication import auth_client, token_cache, token_verifier
+from controllers.metrics import METRICS_CONTENT_TYPE, RequestMetricsMiddleware, record_pool_stats
+from configs.db import Base, SessionLocal, async_engine, engine, pool_stats
+from configs.env import settings
+from configs.log import configure_logging
+from repositories.follow_graph import follow_graph, recommendation_cache
+from repositories.profile_cache import profile_cache
+from repositories.repository import ProfileRepository
+from jobs.refresh_leaderboard import refresh as refresh_leaderboard
+from services.metrics import registry
+from services.periodic import PeriodicTask
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+configure_logging()
+
+def reload_follow_graph():
+    db = SessionLocal()
+    try:
+        ProfileRepository.load_follow_graph(db)
+    finally:
+        db.close()
+
+def sync_follow_graph():
+    db = SessionLocal()
+    try:
+        ProfileRepository.sync_follow_graph(db)
+    finally:
+        db.close()
+
+leaderboard_refresh = PeriodicTask("leaderboard refresh", refresh_leaderboard, settings.LEADERBOARD_REFRESH_INTERVAL)
+# Loads the follow graph at startup, and picks up the follows and unfollows
+# of other workers by reloading it and, between reloads, polling new follows.
+follow_graph_reload = PeriodicTask("follow graph reload", reload_follow_graph, settings.FOLLOW_GRAPH_RELOAD_INTERVAL)
+follow_graph_sync = PeriodicTask("follow graph sync", sync_follow_graph, settings.FOLLOW_GRAPH_SYNC_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if token_verifier is not None:
+        token_verifier.jwks.start()
+    if settings.LEADERBOARD_REFRESH_INTERVAL > 0:
+        leaderboard_refresh.start()
+    if settings.FOLLOW_GRAPH_RELOAD_INTERVAL > 0:
+        follow_graph_reload.start()
+        if settings.FOLLOW_GRAPH_SYNC_INTERVAL > 0:
+            follow_graph_sync.start()
+    yield
+    await follow_graph_sync.stop()
+    await follow_graph_reload.stop()
+    await leaderboard_refresh.stop()
+    if token_verifier is not None:
+        await token_verifier.jwks.stop()
+    await auth_client.aclose()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app.include_router(router, prefix="/profiles", tags=["profiles"])
+# DB_ASYNC selects the AsyncSession-backed handlers instead of the threadpool ones.
+app.include_router(async_router if settings.DB_ASYNC else router, prefix="/profiles", tags=["profiles"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,10 +71,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginated endpoints return the next page cursor in this header.
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 Base.metadata.create_all(bind=engine)
 
 @app.get("/")
 def root():
     return {"message": "Profile Microservice Running!"}
+
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "auth_tokens": token_cache.stats(),
+        "profiles": profile_cache.stats(),
+        "recommendations": recommendation_cache.stats(),
+        "follow_graph": follow_graph.stats(),
+    }
+
+@app.get("/pool-stats")
+def connection_pool_stats():
+    return pool_stats()
+
+@app.get("/metrics")
+def metrics():
+    record_pool_stats(pool_stats())
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,6 @@
+-- Indexes for keyset pagination of followers.
+-- New databases get them from Base.metadata.create_all.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follows_followed_follower
+    ON follows (followed, follower);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follows_followed_created_at_follower
+    ON follows (followed, created_at, follower);
@@ -0,0 +1,5 @@
+-- Follower and following counters on profiles.
+-- New databases get the columns from Base.metadata.create_all; existing ones
+-- are backfilled afterwards with `python -m jobs.rebuild_follow_counts`.
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS followers_count integer NOT NULL DEFAULT 0;
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS following_count integer NOT NULL DEFAULT 0;
@@ -0,0 +1,13 @@
+-- Materialized leaderboards and the index for recent follows.
+-- New databases get them from Base.metadata.create_all.
+CREATE TABLE IF NOT EXISTS leaderboard (
+    board varchar NOT NULL,
+    verified boolean NOT NULL,
+    rank integer NOT NULL,
+    username varchar NOT NULL,
+    score integer NOT NULL,
+    refreshed_at timestamp NOT NULL,
+    PRIMARY KEY (board, verified, rank)
+);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follows_created_at
+    ON follows (created_at);
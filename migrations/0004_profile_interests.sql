@@ -0,0 +1,21 @@
+-- Move interests from the comma-joined profiles.interests column into
+-- profile_interests. New databases get the table from Base.metadata.create_all.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS profile_interests (
+    interest varchar NOT NULL,
+    username varchar NOT NULL REFERENCES profiles (username) ON DELETE CASCADE ON UPDATE CASCADE,
+    position integer NOT NULL,
+    PRIMARY KEY (interest, username)
+);
+CREATE INDEX IF NOT EXISTS ix_profile_interests_username ON profile_interests (username);
+
+INSERT INTO profile_interests (interest, username, position)
+SELECT item.interest, profiles.username, item.position - 1
+FROM profiles, unnest(string_to_array(profiles.interests, ',')) WITH ORDINALITY AS item(interest, position)
+WHERE item.interest <> ''
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE profiles DROP COLUMN interests;
+
+COMMIT;
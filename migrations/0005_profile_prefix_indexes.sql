@@ -0,0 +1,8 @@
+-- Indexes for case-insensitive prefix search of usernames, names and surnames.
+-- New databases get them from Base.metadata.create_all.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_username_prefix
+    ON profiles (lower(username) text_pattern_ops, username);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_name_prefix
+    ON profiles (lower(name) text_pattern_ops, username);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_surname_prefix
+    ON profiles (lower(surname) text_pattern_ops, username);
@@ -0,0 +1,12 @@
+-- Full text search document over names, location and description, weighted in
+-- that order, stored as a generated column with a GIN index. The expression
+-- must match PROFILE_SEARCH_DOCUMENT in models/model.py. Adding the column
+-- rewrites profiles under an exclusive lock. New databases get both from
+-- Base.metadata.create_all.
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS search_document tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple'::regconfig, coalesce(name, '') || ' ' || coalesce(surname, '')), 'A')
+    || setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'B')
+    || setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'C')
+) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_search ON profiles USING gin (search_document);
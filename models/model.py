@@ -1,7 +1,18 @@
-from sqlalchemy import Boolean, Column, String, Date, Text, DateTime
+from sqlalchemy import Boolean, Column, Computed, String, Date, Text, DateTime, ForeignKey, Index, Integer, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.ext.orderinglist import ordering_list
+from sqlalchemy.orm import relationship
 from configs.db import Base
 import datetime
 
+# Weighted text search document of a profile, stored in profiles.search_document.
+PROFILE_SEARCH_DOCUMENT = """(
+    setweight(to_tsvector('simple'::regconfig, coalesce(name, '') || ' ' || coalesce(surname, '')), 'A')
+    || setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'B')
+    || setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'C')
+)"""
+
 class Profile(Base):
     __tablename__ = 'profiles'
 
@@ -12,8 +23,44 @@ class Profile(Base):
     location = Column(String)
     description = Column(Text)
     date_of_birth = Column(Date)
-    interests = Column(Text)
     is_verified = Column(Boolean, default=False)
+    # Maintained by the follow and unfollow statements, see repositories/repository.py.
+    followers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Kept up to date by Postgres and only read by search queries, so it is
+    # not mapped and profiles are loaded without it.
+    search_document = Column(TSVECTOR, Computed(PROFILE_SEARCH_DOCUMENT, persisted=True))
+
+    # Interests are rows of profile_interests, read and written as a list of strings.
+    interest_rows = relationship(
+        "ProfileInterest",
+        order_by="ProfileInterest.position",
+        collection_class=ordering_list("position"),
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    interests = association_proxy("interest_rows", "interest", creator=lambda interest: ProfileInterest(interest=interest))
+
+    # Case-insensitive prefix search for autocomplete, and full text search.
+    __table_args__ = (
+        Index("ix_profiles_username_prefix", func.lower(username).label("username_lower"), username, postgresql_ops={"username_lower": "text_pattern_ops"}),
+        Index("ix_profiles_name_prefix", func.lower(name).label("name_lower"), username, postgresql_ops={"name_lower": "text_pattern_ops"}),
+        Index("ix_profiles_surname_prefix", func.lower(surname).label("surname_lower"), username, postgresql_ops={"surname_lower": "text_pattern_ops"}),
+        Index("ix_profiles_search", search_document, postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_document"]}
+
+class ProfileInterest(Base):
+    __tablename__ = 'profile_interests'
+
+    # The primary key doubles as the index for profiles by interest.
+    interest = Column(String, primary_key=True)
+    username = Column(String, ForeignKey("profiles.username", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True)
+    position = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_profile_interests_username", "username"),
+    )
 
 class Follows(Base):
     __tablename__ = 'follows'
@@ -21,5 +68,24 @@ class Follows(Base):
     follower = Column(String, primary_key=True, index=True)
     followed = Column(String, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.datetime.now(), nullable=False)
+
+    # Keyset pagination of a user's followers by username and by follow time.
+    __table_args__ = (
+        Index("ix_follows_followed_follower", "followed", "follower"),
+        Index("ix_follows_followed_created_at_follower", "followed", "created_at", "follower"),
+        # Recent follows for the growth leaderboard.
+        Index("ix_follows_created_at", "created_at"),
+    )
+
+class LeaderboardEntry(Base):
+    __tablename__ = 'leaderboard'
+
+    # Rebuilt as a whole by ProfileRepository.refresh_leaderboard.
+    board = Column(String, primary_key=True)
+    verified = Column(Boolean, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False)
+    score = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
     
 
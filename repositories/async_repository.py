@@ -0,0 +1,406 @@
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import datetime
+from models.model import Follows, LeaderboardEntry, Profile, ProfileInterest
+from schemas.schema import ProfileCreate
+from repositories.profile_cache import profile_cache
+from repositories.follow_graph import follow_graph, invalidate_recommendations
+from repositories.pagination import async_paginate
+from repositories.repository import (
+    AUTOCOMPLETE_QUERY,
+    BATCH_FOLLOW_QUERY,
+    BATCH_PARTICIPANTS_QUERY,
+    BATCH_UNFOLLOW_QUERY,
+    FOLLOW_PARTICIPANTS_QUERY,
+    FOLLOW_QUERY,
+    POPULAR_INTERESTS_QUERY,
+    PROFILE_EXPORT_QUERY,
+    REBUILD_FOLLOW_COUNTS_QUERY,
+    SHARED_INTERESTS_QUERY,
+    UNFOLLOW_QUERY,
+    VIEW_ACCESS_QUERY,
+    autocomplete_suggestions,
+    leaderboard_item,
+    prefix_range,
+    profile_search,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncProfileRepository:
+    """
+    Async variant of ProfileRepository for AsyncSession.
+    """
+
+    @staticmethod
+    async def get_by_email(db: AsyncSession, email: str):
+        """
+        Get a profile by email.
+        """
+        logger.debug("Getting profile with email %s", email)
+        result = await db.execute(select(Profile).filter(Profile.email == email))
+        return result.scalars().first()
+
+    @staticmethod
+    async def create_profile(db: AsyncSession, profile_data: ProfileCreate, email: str):
+        """
+        Create a profile in the database.
+        """
+        profile_data = profile_data.model_dump()
+        profile_data["interests"] = list(dict.fromkeys(profile_data.get("interests") or []))
+
+        logger.debug("Creating profile %s", profile_data["username"])
+        db_profile = Profile(**profile_data, email=email)
+        db.add(db_profile)
+        await db.commit()
+        await db.refresh(db_profile)
+        logger.debug("Profile created with email %s", db_profile.email)
+        return db_profile
+
+    @staticmethod
+    async def update_profile(db: AsyncSession, profile: Profile, profile_data: ProfileCreate):
+        """
+        Update a profile in the database.
+        """
+        logger.debug("Updating profile %s", profile_data.username)
+        username = profile.username
+        data = profile_data.model_dump()
+        interests = list(dict.fromkeys(data.pop("interests") or []))
+        for key, value in data.items():
+            setattr(profile, key, value)
+        # A rename cascades to the stored interests, flush it before replacing
+        # them so that kept interests update in place instead of colliding.
+        await db.flush()
+        profile.interests = interests
+        await db.commit()
+        await db.refresh(profile)
+        profile_cache.invalidate(username, profile.email)
+        logger.debug("Profile updated with email %s", profile.email)
+        return profile
+
+    @staticmethod
+    async def delete_profile(db: AsyncSession, profile: Profile):
+        """
+        Delete a profile from the database.
+        """
+        logger.debug("Deleting profile with email %s", profile.email)
+        await db.delete(profile)
+        await db.commit()
+        profile_cache.invalidate(profile.username, profile.email)
+        logger.debug("Profile deleted with email %s", profile.email)
+        return profile
+
+    @staticmethod
+    async def get_usernames_page(db: AsyncSession, limit: int, after: str = None):
+        """
+        Get a page of usernames ordered by username.
+        """
+        logger.debug("Getting usernames after %s", after)
+        return await async_paginate(db, select(Profile.username), [Profile.username], limit, after, lambda row: row.username)
+
+    @staticmethod
+    async def get_profile_by_username(db: AsyncSession, username: str):
+        """
+        Get a profile by username.
+        """
+        logger.debug("Getting profile with username %s", username)
+        result = await db.execute(select(Profile).filter(Profile.username == username))
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_profiles_by(db: AsyncSession, field: str, keys: list):
+        """
+        Get the profiles whose username or email field is in keys, in any order.
+        """
+        logger.debug("Getting profiles by %s for %s keys", field, len(keys))
+        column = getattr(Profile, field)
+        result = await db.execute(select(Profile).filter(column.in_(keys)))
+        return result.scalars().all()
+
+    @staticmethod
+    async def follow_user(db: AsyncSession, follower_email: str, followed: str):
+        """
+        Follow a user in a single statement. Returns the follower username, or
+        None if nothing was inserted because a user is missing, the user tried
+        to follow themselves or the follow already exists.
+        """
+        logger.debug("Following user %s", followed)
+        created_at = datetime.datetime.now()
+        result = await db.execute(FOLLOW_QUERY, {"follower_email": follower_email, "followed": followed, "created_at": created_at})
+        follower = result.scalar()
+        await db.commit()
+        if follower is not None:
+            profile_cache.invalidate(username=follower)
+            profile_cache.invalidate(username=followed)
+            follow_graph.follow(follower, [followed])
+            invalidate_recommendations(follower)
+        logger.debug("User %s followed: %s", followed, follower is not None)
+        return follower
+
+    @staticmethod
+    async def unfollow_user(db: AsyncSession, follower_email: str, followed: str):
+        """
+        Unfollow a user in a single statement. Returns the follower username, or
+        None if there was no such follow.
+        """
+        logger.debug("Unfollowing user %s", followed)
+        result = await db.execute(UNFOLLOW_QUERY, {"follower_email": follower_email, "followed": followed})
+        follower = result.scalar()
+        await db.commit()
+        if follower is not None:
+            profile_cache.invalidate(username=follower)
+            profile_cache.invalidate(username=followed)
+            follow_graph.unfollow(follower, [followed])
+            invalidate_recommendations(follower)
+        logger.debug("User %s unfollowed: %s", followed, follower is not None)
+        return follower
+
+    @staticmethod
+    async def get_follow_participants(db: AsyncSession, follower_email: str, followed: str):
+        """
+        Get the username for the follower email and whether the followed user exists.
+        """
+        logger.debug("Getting follow participants %s and %s", follower_email, followed)
+        result = await db.execute(FOLLOW_PARTICIPANTS_QUERY, {"follower_email": follower_email, "followed": followed})
+        return result.one()
+
+    @staticmethod
+    async def get_batch_participants(db: AsyncSession, follower_email: str, usernames: list):
+        """
+        Get the profile of the follower email and the profiles among usernames
+        that exist, as rows of username and is_follower.
+        """
+        logger.debug("Getting batch participants for %s and %s usernames", follower_email, len(usernames))
+        result = await db.execute(BATCH_PARTICIPANTS_QUERY, {"follower_email": follower_email, "usernames": usernames})
+        return result.all()
+
+    @staticmethod
+    async def follow_users(db: AsyncSession, follower: str, usernames: list):
+        """
+        Follow several users in a single statement and commit. Returns the set
+        of usernames that were followed.
+        """
+        logger.debug("User %s following %s users", follower, len(usernames))
+        created_at = datetime.datetime.now()
+        result = await db.execute(BATCH_FOLLOW_QUERY, {"follower": follower, "usernames": usernames, "created_at": created_at})
+        followed = set(result.scalars())
+        await db.commit()
+        for username in {follower} | followed:
+            profile_cache.invalidate(username=username)
+        follow_graph.follow(follower, followed)
+        invalidate_recommendations(follower)
+        logger.debug("User %s followed %s users", follower, len(followed))
+        return followed
+
+    @staticmethod
+    async def unfollow_users(db: AsyncSession, follower: str, usernames: list):
+        """
+        Unfollow several users in a single statement and commit. Returns the set
+        of usernames that were unfollowed.
+        """
+        logger.debug("User %s unfollowing %s users", follower, len(usernames))
+        result = await db.execute(BATCH_UNFOLLOW_QUERY, {"follower": follower, "usernames": usernames})
+        unfollowed = set(result.scalars())
+        await db.commit()
+        for username in {follower} | unfollowed:
+            profile_cache.invalidate(username=username)
+        follow_graph.unfollow(follower, unfollowed)
+        invalidate_recommendations(follower)
+        logger.debug("User %s unfollowed %s users", follower, len(unfollowed))
+        return unfollowed
+
+    @staticmethod
+    async def get_followed_emails(db: AsyncSession, follower: str, batch_size: int = 1000):
+        """
+        Get the emails of all users followed by a user, fetched in batches.
+        """
+        logger.debug("Getting emails of users followed by %s", follower)
+        query = (
+            select(Profile.email)
+            .join(Follows, Follows.followed == Profile.username)
+            .filter(Follows.follower == follower)
+            .execution_options(yield_per=batch_size)
+        )
+        return await db.stream_scalars(query)
+
+    @staticmethod
+    async def get_view_access(db: AsyncSession, viewer_email: str, username: str):
+        """
+        Get the viewer username and whether the viewer and the user follow each
+        other, or None if the viewer has no profile.
+        """
+        logger.debug("Getting view access of %s to %s", viewer_email, username)
+        result = await db.execute(VIEW_ACCESS_QUERY, {"viewer_email": viewer_email, "username": username})
+        return result.first()
+
+    @staticmethod
+    async def get_followed_page(db: AsyncSession, follower: str, limit: int, after: str = None):
+        """
+        Get a page of users followed by a user ordered by username.
+        """
+        logger.debug("Getting users followed by %s after %s", follower, after)
+        query = select(Follows.followed).filter(Follows.follower == follower)
+        return await async_paginate(db, query, [Follows.followed], limit, after, lambda row: row.followed)
+
+    @staticmethod
+    async def get_followers_page(db: AsyncSession, followed: str, limit: int, after: str = None):
+        """
+        Get a page of users following a user ordered by username.
+        """
+        logger.debug("Getting users following %s after %s", followed, after)
+        query = select(Follows.follower).filter(Follows.followed == followed)
+        return await async_paginate(db, query, [Follows.follower], limit, after, lambda row: row.follower)
+
+    @staticmethod
+    async def get_followers_with_timestamp_page(db: AsyncSession, followed: str, limit: int, after: str = None):
+        """
+        Get a page of users following a user with timestamp, oldest first.
+        """
+        logger.debug("Getting users following %s with timestamp after %s", followed, after)
+        query = select(Follows.follower, Follows.created_at).filter(Follows.followed == followed)
+        return await async_paginate(
+            db,
+            query,
+            [Follows.created_at, Follows.follower],
+            limit,
+            after,
+            lambda row: {"follower": row.follower, "created_at": row.created_at},
+        )
+
+    @staticmethod
+    async def verify_user(db: AsyncSession, username: str):
+        """
+        Verify a user.
+        """
+        logger.debug("Verifying user %s", username)
+        query = text("UPDATE profiles SET is_verified = TRUE WHERE username = :username")
+        await db.execute(query, {"username": username})
+        await db.commit()
+        profile_cache.invalidate(username=username)
+        logger.debug("User %s verified successfully", username)
+
+    @staticmethod
+    async def unverify_user(db: AsyncSession, username: str):
+        """
+        Unverify a user.
+        """
+        logger.debug("Unverifying user %s", username)
+        query = text("UPDATE profiles SET is_verified = FALSE WHERE username = :username")
+        await db.execute(query, {"username": username})
+        await db.commit()
+        profile_cache.invalidate(username=username)
+        logger.debug("User %s unverified successfully", username)
+
+    @staticmethod
+    async def rebuild_follow_counts(db: AsyncSession):
+        """
+        Recompute the follower and following counters of every profile from
+        follows. Returns the usernames whose counters were wrong.
+        """
+        logger.info("Rebuilding follow counts")
+        result = await db.execute(REBUILD_FOLLOW_COUNTS_QUERY)
+        repaired = result.scalars().all()
+        await db.commit()
+        for username in repaired:
+            profile_cache.invalidate(username=username)
+        logger.info("Follow counts repaired for %s profiles", len(repaired))
+        return repaired
+
+    @staticmethod
+    async def get_users_page(db: AsyncSession, limit: int, after: str = None):
+        """
+        Get a page of users ordered by username.
+        """
+        logger.debug("Getting users after %s", after)
+        return await async_paginate(db, select(Profile), [Profile.username], limit, after, scalars=True)
+
+    @staticmethod
+    async def autocomplete(db: AsyncSession, prefix: str, limit: int):
+        """
+        Get up to limit profiles whose username, name or surname starts with
+        prefix, ignoring case. Username matches come first.
+        """
+        logger.debug("Autocompleting %s", prefix)
+        result = await db.execute(AUTOCOMPLETE_QUERY, prefix_range(prefix) | {"limit": limit})
+        return autocomplete_suggestions(result.all(), limit)
+
+    @staticmethod
+    async def search_profiles_page(db: AsyncSession, query: str, verified: bool, location: str, limit: int, after: str = None):
+        """
+        Get a page of profiles matching a search query, most relevant first.
+        """
+        logger.debug("Searching profiles for %s after %s", query, after)
+        score, conditions = profile_search(query, verified, location)
+        columns = [score, Profile.username]
+        search = select(Profile, *columns).filter(*conditions)
+        return await async_paginate(db, search, columns, limit, after, lambda row: row.Profile)
+
+    @staticmethod
+    async def get_profiles_with_interest_page(db: AsyncSession, interest: str, limit: int, after: str = None):
+        """
+        Get a page of profiles with an interest ordered by username.
+        """
+        logger.debug("Getting profiles with interest %s after %s", interest, after)
+        query = (
+            select(Profile)
+            .join(ProfileInterest, ProfileInterest.username == Profile.username)
+            .filter(ProfileInterest.interest == interest)
+        )
+        return await async_paginate(db, query, [ProfileInterest.username], limit, after, scalars=True)
+
+    @staticmethod
+    async def get_popular_interests(db: AsyncSession, limit: int):
+        """
+        Get the interests with the most profiles and their number of profiles.
+        """
+        logger.debug("Getting %s most popular interests", limit)
+        result = await db.execute(POPULAR_INTERESTS_QUERY.limit(limit))
+        return [{"interest": row.interest, "count": row.count} for row in result]
+
+    @staticmethod
+    async def get_shared_interests(db: AsyncSession, usernames: list, interests: list):
+        """
+        Get the number of interests shared with interests by each existing
+        profile among usernames.
+        """
+        logger.debug("Getting shared interests of %s profiles", len(usernames))
+        result = await db.execute(SHARED_INTERESTS_QUERY, {"usernames": usernames, "interests": interests})
+        return {row.username: row.shared_interests for row in result}
+
+    @staticmethod
+    async def get_verified_usernames_page(db: AsyncSession, limit: int, after: str = None):
+        """
+        Get a page of verified usernames ordered by username.
+        """
+        logger.debug("Getting verified users after %s", after)
+        query = select(Profile.username).filter(Profile.is_verified == True)
+        return await async_paginate(db, query, [Profile.username], limit, after, lambda row: row.username)
+
+    @staticmethod
+    async def get_leaderboard_page(db: AsyncSession, board: str, verified: bool, limit: int, after: str = None):
+        """
+        Get a page of a leaderboard ordered by rank.
+        """
+        logger.debug("Getting %s leaderboard after %s", board, after)
+        query = select(LeaderboardEntry).filter(LeaderboardEntry.board == board, LeaderboardEntry.verified == verified)
+        return await async_paginate(db, query, [LeaderboardEntry.rank], limit, after, leaderboard_item, scalars=True)
+
+    @staticmethod
+    async def stream_profiles(db: AsyncSession, batch_size: int):
+        """
+        Stream all profiles as mappings, fetched from a server-side cursor in batches.
+        """
+        logger.debug("Streaming all profiles")
+        result = await db.stream(PROFILE_EXPORT_QUERY.execution_options(yield_per=batch_size))
+        return result.mappings()
+
+    @staticmethod
+    async def stream_follows(db: AsyncSession, batch_size: int):
+        """
+        Stream all follows as mappings, fetched from a server-side cursor in batches.
+        """
+        logger.debug("Streaming all follows")
+        result = await db.stream(select(Follows.__table__).execution_options(yield_per=batch_size))
+        return result.mappings()
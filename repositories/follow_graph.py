@@ -0,0 +1,187 @@
+import heapq
+import threading
+from array import array
+from collections import Counter
+
+from configs.env import settings
+from services.cache import TTLCache
+
+
+class FollowGraph:
+    """
+    In-memory copy of the follows table for friend-of-friend traversals.
+
+    Usernames are mapped to integer ids and each user's followed ids are
+    stored in one array, delimited by offsets (compressed sparse rows). Follow
+    writes after a load are kept as per-user added and removed sets that take
+    precedence over the arrays, until the next load folds them in.
+
+    Loads run in the background while the previous arrays keep serving reads.
+    Writes recorded during a load are replayed on the new arrays, which are
+    swapped in together with their overlay.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._usernames = []
+        self._offsets = array("q", [0])
+        self._targets = array("q")
+        self._added = {}
+        self._removed = {}
+        self._generation = 0
+        self._pending = None
+        self.loaded = False
+        self.synced_at = None
+
+    def begin_load(self) -> int:
+        """
+        Start a load, returning the generation to pass to load. Writes recorded
+        from now on are replayed on the loaded edges, so begin the load before
+        reading the follows table.
+        """
+        with self._lock:
+            self._generation += 1
+            self._pending = []
+            return self._generation
+
+    def load(self, edges, generation: int):
+        """
+        Replace the graph with (follower, followed) edges, unless a newer load
+        began since generation.
+        """
+        ids, usernames = {}, []
+
+        def id_of(username):
+            id = ids.get(username)
+            if id is None:
+                id = ids[username] = len(usernames)
+                usernames.append(username)
+            return id
+
+        sources, destinations = array("q"), array("q")
+        for follower, followed in edges:
+            sources.append(id_of(follower))
+            destinations.append(id_of(followed))
+
+        offsets = array("q", [0]) * (len(usernames) + 1)
+        for source in sources:
+            offsets[source + 1] += 1
+        for id in range(len(usernames)):
+            offsets[id + 1] += offsets[id]
+        targets = array("q", [0]) * len(destinations)
+        position = offsets[:-1]
+        for source, destination in zip(sources, destinations):
+            targets[position[source]] = destination
+            position[source] += 1
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            pending, self._pending = self._pending, None
+            self._ids, self._usernames = ids, usernames
+            self._offsets, self._targets = offsets, targets
+            self._added, self._removed = {}, {}
+            # The writes recorded during the load may or may not be in the edges read.
+            for write, follower, followed in pending:
+                write(follower, followed)
+            self.loaded = True
+
+    def _id(self, username: str) -> int:
+        id = self._ids.get(username)
+        if id is None:
+            id = self._ids[username] = len(self._usernames)
+            self._usernames.append(username)
+        return id
+
+    def _row(self, id: int):
+        if id + 1 >= len(self._offsets):
+            return 0, 0
+        return self._offsets[id], self._offsets[id + 1]
+
+    def _followed(self, id: int):
+        start, end = self._row(id)
+        followed = self._targets[start:end]
+        added, removed = self._added.get(id), self._removed.get(id)
+        if not added and not removed:
+            return followed
+        added, removed = added or set(), removed or set()
+        return [target for target in followed if target not in removed and target not in added] + list(added)
+
+    def _follow(self, follower: str, usernames):
+        id = self._id(follower)
+        for username in usernames:
+            target = self._id(username)
+            self._removed.get(id, set()).discard(target)
+            self._added.setdefault(id, set()).add(target)
+
+    def _unfollow(self, follower: str, usernames):
+        id = self._id(follower)
+        for username in usernames:
+            target = self._id(username)
+            self._added.get(id, set()).discard(target)
+            self._removed.setdefault(id, set()).add(target)
+
+    def follow(self, follower: str, usernames):
+        """
+        Record that follower now follows usernames. Ignored until the first
+        load begins.
+        """
+        with self._lock:
+            if not self._generation:
+                return
+            self._follow(follower, usernames)
+            if self._pending is not None:
+                self._pending.append((self._follow, follower, list(usernames)))
+
+    def unfollow(self, follower: str, usernames):
+        """
+        Record that follower no longer follows usernames. Ignored until the
+        first load begins.
+        """
+        with self._lock:
+            if not self._generation:
+                return
+            self._unfollow(follower, usernames)
+            if self._pending is not None:
+                self._pending.append((self._unfollow, follower, list(usernames)))
+
+    def friends_of_friends(self, username: str, limit: int) -> list:
+        """
+        Get up to limit (username, count) pairs of users followed by the users
+        username follows, but not by username, with the number of those
+        followees following them, highest count first.
+        """
+        with self._lock:
+            id = self._ids.get(username)
+            if id is None:
+                return []
+            followed = set(self._followed(id))
+            counts = Counter()
+            for followee in followed:
+                counts.update(self._followed(followee))
+            for excluded in followed | {id}:
+                counts.pop(excluded, None)
+            names = self._usernames
+            top = heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], names[item[0]]))
+            return [(names[candidate], count) for candidate, count in top]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "users": len(self._usernames),
+                "edges": len(self._targets),
+                "pending_writes": sum(map(len, self._added.values())) + sum(map(len, self._removed.values())),
+            }
+
+
+follow_graph = FollowGraph()
+
+# Recommendations by (username, by_interests).
+recommendation_cache = TTLCache(settings.RECOMMENDATION_CACHE_MAX_SIZE, settings.RECOMMENDATION_CACHE_TTL)
+
+
+def invalidate_recommendations(username: str):
+    for by_interests in (False, True):
+        recommendation_cache.pop((username, by_interests))
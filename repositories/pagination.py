@@ -0,0 +1,75 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from sqlalchemy import DateTime, literal, tuple_
+
+# A page of results and the cursor of the next page, or None on the last page.
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+    """
+    data = json.dumps([value.isoformat() if isinstance(value, datetime.datetime) else value for value in values])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """
+    Decode a cursor into sort key values for the given columns.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [
+            datetime.datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursorError(f"Invalid cursor {cursor}")
+
+
+def after_cursor(columns: list, cursor: str):
+    """
+    Filter condition for rows that sort after the cursor.
+    """
+    values = decode_cursor(cursor, columns)
+    return tuple_(*columns) > tuple_(*[literal(value, type_=column.type) for column, value in zip(columns, values)])
+
+
+def _to_page(rows: list, columns: list, limit: int, row_to_item) -> Page:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return Page([row_to_item(row) for row in rows], next_cursor)
+
+
+def paginate(query, columns: list, limit: int, after: str = None, row_to_item=lambda row: row) -> Page:
+    """
+    Get one page of a query ordered by columns, which must be unique together.
+    """
+    if after is not None:
+        query = query.filter(after_cursor(columns, after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    return _to_page(rows, columns, limit, row_to_item)
+
+
+async def async_paginate(db, query, columns: list, limit: int, after: str = None, row_to_item=lambda row: row, scalars: bool = False) -> Page:
+    """
+    Get one page of a select ordered by columns, which must be unique together.
+    """
+    if after is not None:
+        query = query.where(after_cursor(columns, after))
+    result = await db.execute(query.order_by(*columns).limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+    return _to_page(list(rows), columns, limit, row_to_item)
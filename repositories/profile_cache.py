@@ -0,0 +1,60 @@
+import threading
+
+from configs.env import settings
+from services.cache import TTLCache
+
+
+class ProfileCache:
+    """
+    Profile dicts keyed by both username and email.
+
+    Repository writes invalidate entries. Readers pass the generation they saw
+    before querying to set, so a read that raced with a write cannot store the
+    profile it loaded before the write.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.entries = TTLCache(max_size, ttl)
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, field: str, key: str):
+        """
+        Get a copy of the profile whose username or email field is key, or None.
+        """
+        profile = self.entries.get((field, key))
+        return None if profile is None else dict(profile)
+
+    def set(self, profile: dict, generation: int):
+        """
+        Store a profile under its username and email, unless it was invalidated
+        since generation.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self.entries.set(("username", profile["username"]), profile)
+            self.entries.set(("email", profile["email"]), profile)
+
+    def invalidate(self, username: str = None, email: str = None):
+        """
+        Remove a profile by username and/or email, under both of its keys.
+        """
+        with self._lock:
+            self.generation += 1
+            for key in (("username", username), ("email", email)):
+                profile = self.entries.pop(key)
+                if profile is not None:
+                    self.entries.pop(("username", profile["username"]))
+                    self.entries.pop(("email", profile["email"]))
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+
+profile_cache = ProfileCache(settings.PROFILE_CACHE_MAX_SIZE, settings.PROFILE_CACHE_TTL)
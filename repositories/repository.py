@@ -1,13 +1,253 @@
-from sqlalchemy import text
+from sqlalchemy import Double, String, bindparam, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.orm import Session
 import logging
 import datetime
-from models.model import Follows, Profile
+from models.model import Follows, LeaderboardEntry, Profile, ProfileInterest
 from schemas.schema import ProfileCreate
+from repositories.profile_cache import profile_cache
+from repositories.follow_graph import follow_graph, invalidate_recommendations
+from repositories.pagination import paginate
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+def _counting(changes: str, delta: int, result: str) -> str:
+    """
+    Wrap a statement that inserts or deletes follows and returns their
+    follower and followed, so that the same statement moves the follower
+    counters of every profile involved by delta per edge.
+
+    The profiles are locked in username order before any is updated, so that
+    concurrent statements touching the same profiles, like A following B while
+    B follows A, wait for each other instead of deadlocking.
+    """
+    return f"""
+    WITH changed AS ({changes}),
+    deltas AS (
+        SELECT username, sum(followers) AS followers, sum(following) AS following
+        FROM (
+            SELECT followed AS username, {delta} AS followers, 0 AS following FROM changed
+            UNION ALL
+            SELECT follower AS username, 0 AS followers, {delta} AS following FROM changed
+        ) AS edges
+        GROUP BY username
+    ),
+    locked AS (
+        SELECT deltas.*
+        FROM profiles
+        JOIN deltas ON deltas.username = profiles.username
+        ORDER BY profiles.username
+        FOR NO KEY UPDATE OF profiles
+    ),
+    counted AS (
+        UPDATE profiles
+        SET followers_count = profiles.followers_count + locked.followers,
+            following_count = profiles.following_count + locked.following
+        FROM locked
+        WHERE profiles.username = locked.username
+    )
+    SELECT {result} FROM changed
+    """
+
+
+# Follow and unfollow resolve the follower from its email and rely on the
+# follows primary key to detect duplicates, so each is a single round trip.
+FOLLOW_QUERY = text(_counting("""
+    INSERT INTO follows (follower, followed, created_at)
+    SELECT follower.username, followed.username, :created_at
+    FROM profiles AS follower
+    JOIN profiles AS followed ON followed.username = :followed
+    WHERE follower.email = :follower_email AND follower.username <> followed.username
+    ON CONFLICT (follower, followed) DO NOTHING
+    RETURNING follower, followed
+""", 1, "follower"))
+
+UNFOLLOW_QUERY = text(_counting("""
+    DELETE FROM follows
+    USING profiles AS follower
+    WHERE follows.follower = follower.username
+      AND follower.email = :follower_email
+      AND follows.followed = :followed
+    RETURNING follows.follower, follows.followed
+""", -1, "follower"))
+
+# Both existence checks are primary key lookups on follows.
+VIEW_ACCESS_QUERY = text("""
+    SELECT
+        viewer.username,
+        EXISTS (SELECT 1 FROM follows WHERE follower = viewer.username AND followed = :username)
+        AND EXISTS (SELECT 1 FROM follows WHERE follower = :username AND followed = viewer.username) AS mutual
+    FROM profiles AS viewer
+    WHERE viewer.email = :viewer_email
+""")
+
+# Batch variants take the follower username resolved by
+# BATCH_PARTICIPANTS_QUERY in the same transaction.
+BATCH_FOLLOW_QUERY = text(_counting("""
+    INSERT INTO follows (follower, followed, created_at)
+    SELECT follower.username, followed.username, :created_at
+    FROM profiles AS follower
+    JOIN profiles AS followed ON followed.username IN :usernames
+    WHERE follower.username = :follower AND follower.username <> followed.username
+    ON CONFLICT (follower, followed) DO NOTHING
+    RETURNING follower, followed
+""", 1, "followed")).bindparams(bindparam("usernames", expanding=True))
+
+BATCH_UNFOLLOW_QUERY = text(_counting("""
+    DELETE FROM follows
+    WHERE follower = :follower AND followed IN :usernames
+    RETURNING follower, followed
+""", -1, "followed")).bindparams(bindparam("usernames", expanding=True))
+
+# Recomputes every counter from follows, touching only profiles that drifted.
+REBUILD_FOLLOW_COUNTS_QUERY = text("""
+    WITH followers AS (
+        SELECT followed AS username, count(*) AS total FROM follows GROUP BY followed
+    ),
+    following AS (
+        SELECT follower AS username, count(*) AS total FROM follows GROUP BY follower
+    ),
+    counts AS (
+        SELECT
+            profiles.username,
+            COALESCE(followers.total, 0) AS followers_count,
+            COALESCE(following.total, 0) AS following_count
+        FROM profiles
+        LEFT JOIN followers ON followers.username = profiles.username
+        LEFT JOIN following ON following.username = profiles.username
+    )
+    UPDATE profiles
+    SET followers_count = counts.followers_count, following_count = counts.following_count
+    FROM counts
+    WHERE profiles.username = counts.username
+      AND (profiles.followers_count, profiles.following_count)
+          IS DISTINCT FROM (counts.followers_count, counts.following_count)
+    RETURNING profiles.username
+""")
+
+# Leaderboard scores, as username, is_verified and score.
+LEADERBOARD_SCORES = {
+    "followers": """
+        SELECT username, COALESCE(is_verified, FALSE) AS is_verified, followers_count AS score
+        FROM profiles
+    """,
+    "growth": """
+        SELECT profiles.username, COALESCE(profiles.is_verified, FALSE) AS is_verified, count(*) AS score
+        FROM follows
+        JOIN profiles ON profiles.username = follows.followed
+        WHERE follows.created_at >= :since
+        GROUP BY profiles.username, profiles.is_verified
+    """,
+}
+
+LEADERBOARD_QUERIES = {
+    board: text(f"""
+        INSERT INTO leaderboard (board, verified, rank, username, score, refreshed_at)
+        SELECT :board, :verified, row_number() OVER (ORDER BY score DESC, username), username, score, :refreshed_at
+        FROM ({scores}) AS scores
+        WHERE is_verified OR NOT :verified
+        ORDER BY score DESC, username
+        LIMIT :size
+    """)
+    for board, scores in LEADERBOARD_SCORES.items()
+}
+
+# Held by the transaction that refreshes the leaderboard, so that workers
+# refreshing it at the same time skip instead of inserting the same ranks.
+LEADERBOARD_REFRESH_LOCK_QUERY = text("SELECT pg_try_advisory_xact_lock(hashtext('leaderboard_refresh'))")
+
+# Profiles with their interests as an array, in the column order exports had
+# when interests were a column of profiles.
+_profile_columns = [attribute.columns[0] for attribute in Profile.__mapper__.column_attrs]
+_interests_position = _profile_columns.index(Profile.__table__.c.date_of_birth) + 1
+PROFILE_EXPORT_QUERY = select(
+    *_profile_columns[:_interests_position],
+    select(func.array_agg(aggregate_order_by(ProfileInterest.interest, ProfileInterest.position)))
+    .where(ProfileInterest.username == Profile.username)
+    .scalar_subquery()
+    .label("interests"),
+    *_profile_columns[_interests_position:],
+)
+
+POPULAR_INTERESTS_QUERY = (
+    select(ProfileInterest.interest, func.count().label("count"))
+    .group_by(ProfileInterest.interest)
+    .order_by(func.count().desc(), ProfileInterest.interest)
+)
+
+FOLLOW_EDGES_QUERY = select(Follows.follower, Follows.followed)
+
+# Follows made by other workers are polled with this much overlap, to catch
+# transactions that committed after later ones and small clock differences.
+FOLLOW_GRAPH_SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+# Existing profiles among usernames with the number of the given interests they have.
+SHARED_INTERESTS_QUERY = text("""
+    SELECT profiles.username, count(profile_interests.interest) AS shared_interests
+    FROM profiles
+    LEFT JOIN profile_interests
+        ON profile_interests.username = profiles.username AND profile_interests.interest IN :interests
+    WHERE profiles.username IN :usernames
+    GROUP BY profiles.username
+""").bindparams(bindparam("usernames", expanding=True), bindparam("interests", expanding=True, type_=String))
+
+# Each branch reads the text_pattern_ops index on its column in order, so the
+# query reads at most 3 * limit index entries whatever the prefix.
+AUTOCOMPLETE_QUERY = text("""
+    (
+        SELECT username, name, surname, 0 AS priority, lower(username) AS match
+        FROM profiles
+        WHERE lower(username) ~>=~ :low AND lower(username) ~<~ :high
+        ORDER BY lower(username) USING ~<~, username
+        LIMIT :limit
+    )
+    UNION ALL
+    (
+        SELECT username, name, surname, 1 AS priority, lower(name) AS match
+        FROM profiles
+        WHERE lower(name) ~>=~ :low AND lower(name) ~<~ :high
+        ORDER BY lower(name) USING ~<~, username
+        LIMIT :limit
+    )
+    UNION ALL
+    (
+        SELECT username, name, surname, 2 AS priority, lower(surname) AS match
+        FROM profiles
+        WHERE lower(surname) ~>=~ :low AND lower(surname) ~<~ :high
+        ORDER BY lower(surname) USING ~<~, username
+        LIMIT :limit
+    )
+""")
+
+def profile_search(query: str, verified: bool = None, location: str = None):
+    """
+    Relevance score and filter conditions for a web search style query. The
+    score is negated, so that ascending (score, username) is best match first.
+    """
+    document = Profile.__table__.c.search_document
+    tsquery = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), query)
+    # Double precision so that the score round-trips exactly through cursors.
+    score = cast(-func.ts_rank_cd(document, tsquery), Double).label("score")
+    conditions = [document.op("@@")(tsquery)]
+    if verified is not None:
+        conditions.append(Profile.is_verified == verified)
+    if location is not None:
+        conditions.append(func.lower(Profile.location) == location.lower())
+    return score, conditions
+
+
+BATCH_PARTICIPANTS_QUERY = text("""
+    SELECT username, email = :follower_email AS is_follower
+    FROM profiles
+    WHERE email = :follower_email OR username IN :usernames
+""").bindparams(bindparam("usernames", expanding=True))
+
+FOLLOW_PARTICIPANTS_QUERY = text("""
+    SELECT
+        (SELECT username FROM profiles WHERE email = :follower_email) AS follower,
+        EXISTS (SELECT 1 FROM profiles WHERE username = :followed) AS followed_exists
+""")
+
 
 class ProfileRepository:
 
@@ -16,7 +256,7 @@ class ProfileRepository:
         """
         Get a profile by email.
         """
-        logger.info(f"Getting profile with email {email}")
+        logger.debug("Getting profile with email %s", email)
         return db.query(Profile).filter(Profile.email == email).first()
 
     @staticmethod
@@ -25,14 +265,14 @@ class ProfileRepository:
         Create a profile in the database.
         """
         profile_data = profile_data.model_dump()
-        profile_data["interests"] = ",".join(profile_data.get("interests", []))
+        profile_data["interests"] = list(dict.fromkeys(profile_data.get("interests") or []))
 
-        logger.info(f"Creating profile with data {profile_data}")
+        logger.debug("Creating profile %s", profile_data["username"])
         db_profile = Profile(**profile_data, email=email)
         db.add(db_profile)
         db.commit()
         db.refresh(db_profile)
-        logger.info(f"Profile created with email {db_profile.email}")
+        logger.debug("Profile created with email %s", db_profile.email)
         return db_profile
     
     @staticmethod
@@ -40,14 +280,20 @@ class ProfileRepository:
         """
         Update a profile in the database.
         """
-        logger.info(f"Updating profile with data {profile_data.model_dump()}")
-        for key, value in profile_data.model_dump().items():
-            if key == "interests":
-                value = ",".join(value)
+        logger.debug("Updating profile %s", profile_data.username)
+        username = profile.username
+        data = profile_data.model_dump()
+        interests = list(dict.fromkeys(data.pop("interests") or []))
+        for key, value in data.items():
             setattr(profile, key, value)
+        # A rename cascades to the stored interests, flush it before replacing
+        # them so that kept interests update in place instead of colliding.
+        db.flush()
+        profile.interests = interests
         db.commit()
         db.refresh(profile)
-        logger.info(f"Profile updated with email {profile.email}")
+        profile_cache.invalidate(username, profile.email)
+        logger.debug("Profile updated with email %s", profile.email)
         return profile
     
     @staticmethod
@@ -55,109 +301,392 @@ class ProfileRepository:
         """
         Delete a profile from the database.
         """
-        logger.info(f"Deleting profile with email {profile.email}")
+        logger.debug("Deleting profile with email %s", profile.email)
         db.delete(profile)
         db.commit()
-        logger.info(f"Profile deleted with email {profile.email}")
+        profile_cache.invalidate(profile.username, profile.email)
+        logger.debug("Profile deleted with email %s", profile.email)
         return profile
     
     @staticmethod
-    def get_all_usernames(db: Session):
+    def get_usernames_page(db: Session, limit: int, after: str = None):
         """
-        Get all usernames.
+        Get a page of usernames ordered by username.
         """
-        logger.info(f"Getting all usernames")
-        return [username[0] for username in db.query(Profile.username).all()]
+        logger.debug("Getting usernames after %s", after)
+        return paginate(db.query(Profile.username), [Profile.username], limit, after, lambda row: row.username)
     
     @staticmethod
     def get_profile_by_username(db: Session, username: str):
         """
         Get a profile by username.
         """
-        logger.info(f"Getting profile with username {username}")
+        logger.debug("Getting profile with username %s", username)
         return db.query(Profile).filter(Profile.username == username).first()
     
     @staticmethod
-    def follow_user(db: Session, follower: str, followed: str):
+    def get_profiles_by(db: Session, field: str, keys: list):
         """
-        Follow a user.
+        Get the profiles whose username or email field is in keys, in any order.
         """
-        logger.info(f"Following user {followed}")
+        logger.debug("Getting profiles by %s for %s keys", field, len(keys))
+        column = getattr(Profile, field)
+        return db.query(Profile).filter(column.in_(keys)).all()
+
+    @staticmethod
+    def follow_user(db: Session, follower_email: str, followed: str):
+        """
+        Follow a user in a single statement. Returns the follower username, or
+        None if nothing was inserted because a user is missing, the user tried
+        to follow themselves or the follow already exists.
+        """
+        logger.debug("Following user %s", followed)
         created_at = datetime.datetime.now()
-        query = text("INSERT INTO follows (follower, followed, created_at) VALUES (:follower, :followed, :created_at)")
-        db.execute(query, {"follower": follower, "followed": followed, "created_at": created_at})
+        result = db.execute(FOLLOW_QUERY, {"follower_email": follower_email, "followed": followed, "created_at": created_at})
+        follower = result.scalar()
         db.commit()
-        logger.info(f"User {followed} followed successfully")
+        if follower is not None:
+            profile_cache.invalidate(username=follower)
+            profile_cache.invalidate(username=followed)
+            follow_graph.follow(follower, [followed])
+            invalidate_recommendations(follower)
+        logger.debug("User %s followed: %s", followed, follower is not None)
+        return follower
 
     @staticmethod
-    def unfollow_user(db: Session, follower: str, followed: str):
+    def unfollow_user(db: Session, follower_email: str, followed: str):
         """
-        Unfollow a user.
+        Unfollow a user in a single statement. Returns the follower username, or
+        None if there was no such follow.
         """
-        logger.info(f"Unfollowing user {followed}")
-        query = text("DELETE FROM follows WHERE follower = :follower AND followed = :followed")
-        db.execute(query, {"follower": follower, "followed": followed})
+        logger.debug("Unfollowing user %s", followed)
+        result = db.execute(UNFOLLOW_QUERY, {"follower_email": follower_email, "followed": followed})
+        follower = result.scalar()
         db.commit()
-        logger.info(f"User {followed} unfollowed successfully")
-    
+        if follower is not None:
+            profile_cache.invalidate(username=follower)
+            profile_cache.invalidate(username=followed)
+            follow_graph.unfollow(follower, [followed])
+            invalidate_recommendations(follower)
+        logger.debug("User %s unfollowed: %s", followed, follower is not None)
+        return follower
+
     @staticmethod
-    def get_all_followed(db: Session, follower: str):
+    def get_follow_participants(db: Session, follower_email: str, followed: str):
         """
-        Get all users followed by a user.
+        Get the username for the follower email and whether the followed user exists.
         """
-        logger.info(f"Getting all users followed by {follower}")
-        return [followed[0] for followed in db.query(Follows.followed).filter(Follows.follower == follower).all()]
+        logger.debug("Getting follow participants %s and %s", follower_email, followed)
+        return db.execute(FOLLOW_PARTICIPANTS_QUERY, {"follower_email": follower_email, "followed": followed}).one()
     
     @staticmethod
-    def get_all_followers(db: Session, followed: str):
+    def get_batch_participants(db: Session, follower_email: str, usernames: list):
         """
-        Get all users following a user.
+        Get the profile of the follower email and the profiles among usernames
+        that exist, as rows of username and is_follower.
         """
-        logger.info(f"Getting all users following {followed}")
-        return [follower[0] for follower in db.query(Follows.follower).filter(Follows.followed == followed).all()]
-    
+        logger.debug("Getting batch participants for %s and %s usernames", follower_email, len(usernames))
+        return db.execute(BATCH_PARTICIPANTS_QUERY, {"follower_email": follower_email, "usernames": usernames}).all()
+
     @staticmethod
-    def get_all_followers_with_timestamp(db: Session, followed: str):
+    def follow_users(db: Session, follower: str, usernames: list):
         """
-        Get all users following a user with timestamp.
+        Follow several users in a single statement and commit. Returns the set
+        of usernames that were followed.
         """
-        logger.info(f"Getting all users following {followed} with timestamp")
-        return [{"follower": follower[0], "created_at": follower[1]} for follower in db.query(Follows.follower, Follows.created_at).filter(Follows.followed == followed).all()]
-    
+        logger.debug("User %s following %s users", follower, len(usernames))
+        created_at = datetime.datetime.now()
+        result = db.execute(BATCH_FOLLOW_QUERY, {"follower": follower, "usernames": usernames, "created_at": created_at})
+        followed = set(result.scalars())
+        db.commit()
+        for username in {follower} | followed:
+            profile_cache.invalidate(username=username)
+        follow_graph.follow(follower, followed)
+        invalidate_recommendations(follower)
+        logger.debug("User %s followed %s users", follower, len(followed))
+        return followed
+
+    @staticmethod
+    def unfollow_users(db: Session, follower: str, usernames: list):
+        """
+        Unfollow several users in a single statement and commit. Returns the set
+        of usernames that were unfollowed.
+        """
+        logger.debug("User %s unfollowing %s users", follower, len(usernames))
+        result = db.execute(BATCH_UNFOLLOW_QUERY, {"follower": follower, "usernames": usernames})
+        unfollowed = set(result.scalars())
+        db.commit()
+        for username in {follower} | unfollowed:
+            profile_cache.invalidate(username=username)
+        follow_graph.unfollow(follower, unfollowed)
+        invalidate_recommendations(follower)
+        logger.debug("User %s unfollowed %s users", follower, len(unfollowed))
+        return unfollowed
+
+    @staticmethod
+    def get_followed_emails(db: Session, follower: str, batch_size: int = 1000):
+        """
+        Get the emails of all users followed by a user, fetched in batches.
+        """
+        logger.debug("Getting emails of users followed by %s", follower)
+        query = (
+            db.query(Profile.email)
+            .join(Follows, Follows.followed == Profile.username)
+            .filter(Follows.follower == follower)
+            .yield_per(batch_size)
+        )
+        return (email for (email,) in query)
+
+    @staticmethod
+    def get_view_access(db: Session, viewer_email: str, username: str):
+        """
+        Get the viewer username and whether the viewer and the user follow each
+        other, or None if the viewer has no profile.
+        """
+        logger.debug("Getting view access of %s to %s", viewer_email, username)
+        return db.execute(VIEW_ACCESS_QUERY, {"viewer_email": viewer_email, "username": username}).first()
+
+    @staticmethod
+    def get_followed_page(db: Session, follower: str, limit: int, after: str = None):
+        """
+        Get a page of users followed by a user ordered by username.
+        """
+        logger.debug("Getting users followed by %s after %s", follower, after)
+        query = db.query(Follows.followed).filter(Follows.follower == follower)
+        return paginate(query, [Follows.followed], limit, after, lambda row: row.followed)
+
+    @staticmethod
+    def get_followers_page(db: Session, followed: str, limit: int, after: str = None):
+        """
+        Get a page of users following a user ordered by username.
+        """
+        logger.debug("Getting users following %s after %s", followed, after)
+        query = db.query(Follows.follower).filter(Follows.followed == followed)
+        return paginate(query, [Follows.follower], limit, after, lambda row: row.follower)
+
+    @staticmethod
+    def get_followers_with_timestamp_page(db: Session, followed: str, limit: int, after: str = None):
+        """
+        Get a page of users following a user with timestamp, oldest first.
+        """
+        logger.debug("Getting users following %s with timestamp after %s", followed, after)
+        query = db.query(Follows.follower, Follows.created_at).filter(Follows.followed == followed)
+        return paginate(
+            query,
+            [Follows.created_at, Follows.follower],
+            limit,
+            after,
+            lambda row: {"follower": row.follower, "created_at": row.created_at},
+        )
+
     @staticmethod
     def verify_user(db:Session, username: str):
         """
         Verify a user.
         """
-        logger.info(f"Verifying user {username}")
+        logger.debug("Verifying user %s", username)
         query = text("UPDATE profiles SET is_verified = TRUE WHERE username = :username")
         db.execute(query, {"username": username})
         db.commit()
-        logger.info(f"User {username} verified successfully")
+        profile_cache.invalidate(username=username)
+        logger.debug("User %s verified successfully", username)
 
     @staticmethod
     def unverify_user(db:Session, username: str):
         """
         Unverify a user.
         """
-        logger.info(f"Unverifying user {username}")
+        logger.debug("Unverifying user %s", username)
         query = text("UPDATE profiles SET is_verified = FALSE WHERE username = :username")
         db.execute(query, {"username": username})
         db.commit()
-        logger.info(f"User {username} unverified successfully")
+        profile_cache.invalidate(username=username)
+        logger.debug("User %s unverified successfully", username)
+
+    @staticmethod
+    def rebuild_follow_counts(db: Session):
+        """
+        Recompute the follower and following counters of every profile from
+        follows. Returns the usernames whose counters were wrong.
+        """
+        logger.info("Rebuilding follow counts")
+        repaired = db.execute(REBUILD_FOLLOW_COUNTS_QUERY).scalars().all()
+        db.commit()
+        for username in repaired:
+            profile_cache.invalidate(username=username)
+        logger.info("Follow counts repaired for %s profiles", len(repaired))
+        return repaired
 
     @staticmethod
-    def get_all_users(db: Session):
+    def get_users_page(db: Session, limit: int, after: str = None):
         """
-        Get all users.
+        Get a page of users ordered by username.
         """
-        logger.info(f"Getting all users")
-        return [profile for profile in db.query(Profile).all()]
+        logger.debug("Getting users after %s", after)
+        return paginate(db.query(Profile), [Profile.username], limit, after)
     
     @staticmethod
-    def get_verified_users(db: Session):
+    def autocomplete(db: Session, prefix: str, limit: int):
+        """
+        Get up to limit profiles whose username, name or surname starts with
+        prefix, ignoring case. Username matches come first.
+        """
+        logger.debug("Autocompleting %s", prefix)
+        rows = db.execute(AUTOCOMPLETE_QUERY, prefix_range(prefix) | {"limit": limit}).all()
+        return autocomplete_suggestions(rows, limit)
+
+    @staticmethod
+    def search_profiles_page(db: Session, query: str, verified: bool, location: str, limit: int, after: str = None):
+        """
+        Get a page of profiles matching a search query, most relevant first.
+        """
+        logger.debug("Searching profiles for %s after %s", query, after)
+        score, conditions = profile_search(query, verified, location)
+        columns = [score, Profile.username]
+        return paginate(db.query(Profile, *columns).filter(*conditions), columns, limit, after, lambda row: row.Profile)
+
+    @staticmethod
+    def get_profiles_with_interest_page(db: Session, interest: str, limit: int, after: str = None):
+        """
+        Get a page of profiles with an interest ordered by username.
         """
-        Get all verified users.
+        logger.debug("Getting profiles with interest %s after %s", interest, after)
+        query = (
+            db.query(Profile)
+            .join(ProfileInterest, ProfileInterest.username == Profile.username)
+            .filter(ProfileInterest.interest == interest)
+        )
+        return paginate(query, [ProfileInterest.username], limit, after)
+
+    @staticmethod
+    def get_popular_interests(db: Session, limit: int):
+        """
+        Get the interests with the most profiles and their number of profiles.
+        """
+        logger.debug("Getting %s most popular interests", limit)
+        return [{"interest": row.interest, "count": row.count} for row in db.execute(POPULAR_INTERESTS_QUERY.limit(limit))]
+
+    @staticmethod
+    def load_follow_graph(db: Session, batch_size: int = 10000):
+        """
+        Load the follows table into the in-memory follow graph, streaming the
+        edges in batches.
+        """
+        logger.info("Loading follow graph")
+        synced_at = datetime.datetime.now()
+        generation = follow_graph.begin_load()
+        edges = db.execute(FOLLOW_EDGES_QUERY.execution_options(yield_per=batch_size))
+        follow_graph.load(edges, generation)
+        db.rollback()
+        follow_graph.synced_at = synced_at
+        logger.info("Follow graph loaded: %s", follow_graph.stats())
+
+    @staticmethod
+    def sync_follow_graph(db: Session):
+        """
+        Add the follows created since the last load or sync to the in-memory
+        follow graph. Unfollows made elsewhere are picked up by the next load.
+        """
+        if not follow_graph.loaded:
+            return
+        synced_at = datetime.datetime.now()
+        since = follow_graph.synced_at - FOLLOW_GRAPH_SYNC_OVERLAP
+        query = FOLLOW_EDGES_QUERY.filter(Follows.created_at >= since).order_by(Follows.follower)
+        followed = {}
+        for row in db.execute(query):
+            followed.setdefault(row.follower, []).append(row.followed)
+        db.rollback()
+        for follower, usernames in followed.items():
+            follow_graph.follow(follower, usernames)
+        follow_graph.synced_at = synced_at
+        logger.info("Follow graph synced with follows of %s users", len(followed))
+
+    @staticmethod
+    def get_shared_interests(db: Session, usernames: list, interests: list):
         """
-        logger.info(f"Getting all verified users")
-        return [profile.username for profile in db.query(Profile).filter(Profile.is_verified == True).all()]
\ No newline at end of file
+        Get the number of interests shared with interests by each existing
+        profile among usernames.
+        """
+        logger.debug("Getting shared interests of %s profiles", len(usernames))
+        rows = db.execute(SHARED_INTERESTS_QUERY, {"usernames": usernames, "interests": interests})
+        return {row.username: row.shared_interests for row in rows}
+
+    @staticmethod
+    def get_verified_usernames_page(db: Session, limit: int, after: str = None):
+        """
+        Get a page of verified usernames ordered by username.
+        """
+        logger.debug("Getting verified users after %s", after)
+        query = db.query(Profile.username).filter(Profile.is_verified == True)
+        return paginate(query, [Profile.username], limit, after, lambda row: row.username)
+
+    @staticmethod
+    def refresh_leaderboard(db: Session, size: int, growth_since: datetime.datetime):
+        """
+        Replace every leaderboard with the current top profiles by followers and
+        by follows gained since growth_since, overall and verified only. Returns
+        False without refreshing if another refresh is in progress.
+        """
+        logger.info("Refreshing leaderboard")
+        if not db.execute(LEADERBOARD_REFRESH_LOCK_QUERY).scalar():
+            db.rollback()
+            logger.info("Leaderboard refresh already in progress, skipping")
+            return False
+        refreshed_at = datetime.datetime.now()
+        db.query(LeaderboardEntry).delete()
+        for board, query in LEADERBOARD_QUERIES.items():
+            for verified in (False, True):
+                db.execute(query, {
+                    "board": board,
+                    "verified": verified,
+                    "size": size,
+                    "since": growth_since,
+                    "refreshed_at": refreshed_at,
+                })
+        db.commit()
+        logger.info("Leaderboard refreshed at %s", refreshed_at)
+        return True
+
+    @staticmethod
+    def get_leaderboard_page(db: Session, board: str, verified: bool, limit: int, after: str = None):
+        """
+        Get a page of a leaderboard ordered by rank.
+        """
+        logger.debug("Getting %s leaderboard after %s", board, after)
+        query = db.query(LeaderboardEntry).filter(LeaderboardEntry.board == board, LeaderboardEntry.verified == verified)
+        return paginate(query, [LeaderboardEntry.rank], limit, after, leaderboard_item)
+
+    @staticmethod
+    def stream_profiles(db: Session, batch_size: int):
+        """
+        Stream all profiles as mappings, fetched from a server-side cursor in batches.
+        """
+        logger.debug("Streaming all profiles")
+        return db.execute(PROFILE_EXPORT_QUERY.execution_options(yield_per=batch_size)).mappings()
+
+    @staticmethod
+    def stream_follows(db: Session, batch_size: int):
+        """
+        Stream all follows as mappings, fetched from a server-side cursor in batches.
+        """
+        logger.debug("Streaming all follows")
+        return db.execute(select(Follows.__table__).execution_options(yield_per=batch_size)).mappings()
+
+
+def leaderboard_item(entry: LeaderboardEntry) -> dict:
+    return {"rank": entry.rank, "username": entry.username, "score": entry.score}
+
+
+def prefix_range(prefix: str) -> dict:
+    """
+    Bounds of the strings starting with prefix, lowercased.
+    """
+    low = prefix.lower()
+    return {"low": low, "high": low[:-1] + chr(ord(low[-1]) + 1)}
+
+
+def autocomplete_suggestions(rows: list, limit: int) -> list:
+    suggestions = {}
+    for row in sorted(rows, key=lambda row: (row.priority, row.match, row.username)):
+        suggestions.setdefault(row.username, {"username": row.username, "name": row.name, "surname": row.surname})
+    return list(suggestions.values())[:limit]
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import List, Optional
 from datetime import date
 
+from configs.env import settings
+
 class ProfileCreate(BaseModel):
     name: str
     username: str
@@ -16,5 +18,45 @@ class ProfileUpdate(ProfileCreate):
 class ProfileResponse(ProfileCreate):
     email: str
     is_verified: bool
+    followers_count: int = 0
+    following_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UsernameBatch(BaseModel):
+    usernames: List[str] = Field(min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+class FollowResult(BaseModel):
+    username: str
+    status: str
+
+class ProfileLookup(BaseModel):
+    usernames: Optional[List[str]] = Field(None, min_length=1, max_length=settings.BATCH_MAX_SIZE)
+    emails: Optional[List[str]] = Field(None, min_length=1, max_length=settings.BATCH_MAX_SIZE)
+
+    @model_validator(mode="after")
+    def check_one_key(self):
+        if (self.usernames is None) == (self.emails is None):
+            raise ValueError("Exactly one of usernames or emails must be given")
+        return self
+
+class FollowCounts(BaseModel):
+    username: str
+    followers_count: int
+    following_count: int
+
+class InterestCount(BaseModel):
+    interest: str
+    count: int
+
+class Recommendation(BaseModel):
+    username: str
+    mutual_follows: int
+    shared_interests: int
+    score: int
+
+class ProfileSuggestion(BaseModel):
+    username: str
+    name: Optional[str]
+    surname: Optional[str]
@@ -0,0 +1,333 @@
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories.async_repository import AsyncProfileRepository
+from configs.env import settings
+from repositories.follow_graph import follow_graph, recommendation_cache
+from repositories.profile_cache import profile_cache
+from schemas.schema import ProfileCreate
+from services.singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+profile_loads = AsyncSingleFlight()
+
+class AsyncProfileService:
+    """
+    Async variant of ProfileService for AsyncSession.
+    """
+
+    def __init__(self, auth_service_url: str):
+        self.auth_service_url = auth_service_url
+
+    async def create_profile(self, db: AsyncSession, profile_data: ProfileCreate, email: str):
+        logger.debug("Creating profile %s", profile_data.username)
+        existing_profile = await AsyncProfileRepository.get_by_email(db, email)
+        if existing_profile:
+            logger.error("Profile for email %s already exists.", email)
+            raise Exception(f"Profile for email {email} already exists.")
+        logger.debug("Creating profile for email %s", email)
+        return await AsyncProfileRepository.create_profile(db, profile_data, email)
+
+    async def _read_through(self, db: AsyncSession, field: str, key: str, load):
+        """
+        Get a profile dict by username or email from the profile cache, loading
+        it with load on a miss.
+        """
+        profile = profile_cache.get(field, key)
+        if profile is not None:
+            logger.debug("Profile for %s %s served from cache", field, key)
+            return profile
+
+        # Concurrent misses for the same profile share one query and one result.
+        profile = await profile_loads.do((field, key), lambda: self._load_profile(db.bind, field, key, load))
+        return dict(profile)
+
+    async def _load_profile(self, bind, field: str, key: str, load):
+        # The load outlives the request that started it if that request is
+        # cancelled, so it must not use that request's session.
+        async with AsyncSession(bind=bind, expire_on_commit=False) as db:
+            generation = profile_cache.generation
+            profile = await load(db, key)
+            profile = profile and _profile_dict(profile)
+
+        if not profile:
+            logger.error("Profile for %s %s not found.", field, key)
+            raise Exception(f"Profile for {field} {key} not found.")
+
+        profile_cache.set(profile, generation)
+        logger.debug("Profile for %s %s retrieved", field, key)
+        return profile
+
+    async def get_profile(self, db: AsyncSession, email: str):
+        logger.debug("Getting profile")
+        return await self._read_through(db, "email", email, AsyncProfileRepository.get_by_email)
+
+    async def update_profile(self, db: AsyncSession, profile_data: ProfileCreate, email: str):
+        logger.debug("Updating profile %s", profile_data.username)
+        profile = await AsyncProfileRepository.get_by_email(db, email)
+        if not profile:
+            logger.error("Profile for email %s not found.", email)
+            raise Exception(f"Profile for email {email} not found.")
+        logger.debug("Updating profile for email %s", email)
+        return await AsyncProfileRepository.update_profile(db, profile, profile_data)
+
+    async def delete_profile(self, db: AsyncSession, email: str):
+        logger.debug("Deleting profile")
+        profile = await AsyncProfileRepository.get_by_email(db, email)
+        if not profile:
+            logger.error("Profile for email %s not found.", email)
+            raise Exception(f"Profile for email {email} not found.")
+        logger.debug("Deleting profile for email %s", email)
+        return await AsyncProfileRepository.delete_profile(db, profile)
+
+    async def get_all_usernames(self, db: AsyncSession, limit: int, after: str = None):
+        logger.debug("Getting all usernames")
+        return await AsyncProfileRepository.get_usernames_page(db, limit, after)
+
+    async def get_profile_by_username(self, db: AsyncSession, username: str):
+        logger.debug("Getting profiles by username %s", username)
+        return await self._read_through(db, "username", username, AsyncProfileRepository.get_profile_by_username)
+
+    async def get_profile_by_email(self, db: AsyncSession, email: str):
+        logger.debug("Getting profiles by email %s", email)
+        return await self._read_through(db, "email", email, AsyncProfileRepository.get_by_email)
+
+    async def get_follow_counts(self, db: AsyncSession, username: str):
+        logger.debug("Getting follow counts of %s", username)
+        profile = await self.get_profile_by_username(db, username)
+        return {key: profile[key] for key in ("username", "followers_count", "following_count")}
+
+    async def get_profiles_batch(self, db: AsyncSession, usernames: list = None, emails: list = None):
+        """
+        Get profiles by usernames or by emails with one query, in the order of
+        the input and with None for the ones not found.
+        """
+        field, keys = ("username", usernames) if usernames is not None else ("email", emails)
+        logger.debug("Getting %s profiles by %s", len(keys), field)
+        profiles = await AsyncProfileRepository.get_profiles_by(db, field, list(set(keys)))
+        by_key = {getattr(profile, field): profile for profile in profiles}
+        return [
+            _profile_dict(by_key[key]) if key in by_key else None
+            for key in keys
+        ]
+
+    async def follow_user(self, db: AsyncSession, follower_email: str, followed: str):
+        logger.debug("Following user %s", followed)
+
+        if await AsyncProfileRepository.follow_user(db, follower_email, followed):
+            return
+
+        follower_username, followed_exists = await AsyncProfileRepository.get_follow_participants(db, follower_email, followed)
+
+        if not followed_exists:
+            logger.error("Profile for username %s not found.", followed)
+            raise Exception(f"User with username {followed} not found.")
+
+        if follower_username is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
+
+        if follower_username == followed:
+            logger.error("Cannot follow yourself.")
+            raise Exception(f"Cannot follow yourself.")
+
+        logger.error("User with username %s is already followed by user with username %s", followed, follower_username)
+        raise Exception(f"User with username {followed} is already followed by user with username {follower_username}")
+
+    async def unfollow_user(self, db: AsyncSession, follower_email: str, followed: str):
+        logger.debug("Unfollowing user %s", followed)
+
+        if await AsyncProfileRepository.unfollow_user(db, follower_email, followed):
+            return
+
+        follower_username, followed_exists = await AsyncProfileRepository.get_follow_participants(db, follower_email, followed)
+
+        if not followed_exists:
+            logger.error("Profile for username %s not found.", followed)
+            raise Exception(f"User with username {followed} not found.")
+
+        if follower_username is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
+
+        logger.error("User with username %s is not followed by user with username %s", followed, follower_username)
+        raise Exception(f"User with username {followed} is not followed by user with username {follower_username}")
+
+    async def _batch_participants(self, db: AsyncSession, follower_email: str, usernames: list):
+        rows = await AsyncProfileRepository.get_batch_participants(db, follower_email, usernames)
+        follower = next((row.username for row in rows if row.is_follower), None)
+
+        if follower is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
+
+        existing = {row.username for row in rows} & set(usernames)
+        return follower, existing
+
+    async def follow_users(self, db: AsyncSession, follower_email: str, usernames: list):
+        """
+        Follow several users in one transaction, reporting a status for each username.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        logger.debug("Following %s users", len(usernames))
+        follower, existing = await self._batch_participants(db, follower_email, usernames)
+        followed = await AsyncProfileRepository.follow_users(db, follower, list(existing)) if existing else set()
+
+        def status(username):
+            if username in followed:
+                return "followed"
+            if username not in existing:
+                return "not_found"
+            if username == follower:
+                return "self"
+            return "already_followed"
+
+        return [{"username": username, "status": status(username)} for username in usernames]
+
+    async def unfollow_users(self, db: AsyncSession, follower_email: str, usernames: list):
+        """
+        Unfollow several users in one transaction, reporting a status for each username.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        logger.debug("Unfollowing %s users", len(usernames))
+        follower, existing = await self._batch_participants(db, follower_email, usernames)
+        unfollowed = await AsyncProfileRepository.unfollow_users(db, follower, list(existing)) if existing else set()
+
+        def status(username):
+            if username in unfollowed:
+                return "unfollowed"
+            if username not in existing:
+                return "not_found"
+            return "not_followed"
+
+        return [{"username": username, "status": status(username)} for username in usernames]
+
+    async def _authorize_view(self, db: AsyncSession, username: str, user_email: str, relation: str):
+        """
+        Users can see their own follow lists and those of users they mutually follow.
+        """
+        access = await AsyncProfileRepository.get_view_access(db, user_email, username)
+
+        if access is None:
+            logger.error("Profile for email %s not found.", user_email)
+            raise Exception(f"Profile for email {user_email} not found.")
+
+        token_username, mutual = access
+
+        if token_username != username and not mutual:
+            raise Exception(f"User {token_username} is not authorized to view {relation} of user {username}")
+
+    async def get_followed(self, db: AsyncSession, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followed")
+        await self._authorize_view(db, username, user_email, "followed")
+        return await AsyncProfileRepository.get_followed_page(db, username, limit, after)
+
+    async def get_followed_emails(self, db: AsyncSession, username: str, user_email: str):
+        logger.debug("Getting followed emails")
+        await self._authorize_view(db, username, user_email, "followed")
+        return await AsyncProfileRepository.get_followed_emails(db, username)
+
+    async def get_followers(self, db: AsyncSession, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followers")
+        await self._authorize_view(db, username, user_email, "followers")
+        return await AsyncProfileRepository.get_followers_page(db, username, limit, after)
+
+    async def get_followers_with_time(self, db: AsyncSession, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followers with timestamp")
+        await self._authorize_view(db, username, user_email, "followers")
+        return await AsyncProfileRepository.get_followers_with_timestamp_page(db, username, limit, after)
+
+    async def verify_user(self, db, username):
+        logger.debug("Verifying user %s", username)
+        return await AsyncProfileRepository.verify_user(db, username)
+
+    async def unverify_user(self, db, username):
+        logger.debug("Unverifying user %s", username)
+        return await AsyncProfileRepository.unverify_user(db, username)
+
+    async def get_all_users(self, db, limit, after=None):
+        logger.debug("Getting all users")
+        page = await AsyncProfileRepository.get_users_page(db, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+
+    async def autocomplete(self, db: AsyncSession, prefix: str, limit: int):
+        logger.debug("Autocompleting %s", prefix)
+        return await AsyncProfileRepository.autocomplete(db, prefix, limit)
+
+    async def search_profiles(self, db: AsyncSession, query: str, verified: bool, location: str, limit: int, after: str = None):
+        logger.debug("Searching profiles for %s", query)
+        page = await AsyncProfileRepository.search_profiles_page(db, query, verified, location, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+
+    async def get_profiles_by_interest(self, db: AsyncSession, interest: str, limit: int, after: str = None):
+        logger.debug("Getting profiles with interest %s", interest)
+        page = await AsyncProfileRepository.get_profiles_with_interest_page(db, interest, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+
+    async def get_popular_interests(self, db: AsyncSession, limit: int):
+        logger.debug("Getting popular interests")
+        return await AsyncProfileRepository.get_popular_interests(db, limit)
+
+    async def get_recommendations(self, db: AsyncSession, email: str, by_interests: bool, limit: int):
+        """
+        Suggest users followed by the users the user follows, scored by how
+        many of them follow each one and, with by_interests, by the number of
+        interests shared with the user.
+        """
+        profile = await self.get_profile(db, email)
+        logger.debug("Getting recommendations for %s", profile['username'])
+        # The graph is loaded in the background at startup.
+        if not follow_graph.loaded:
+            logger.debug("Follow graph not loaded yet")
+            return []
+
+        key = (profile["username"], by_interests)
+        recommendations = recommendation_cache.get(key)
+        if recommendations is None:
+            recommendations = await self._recommend(db, profile, by_interests)
+            recommendation_cache.set(key, recommendations)
+        return recommendations[:limit]
+
+    async def _recommend(self, db: AsyncSession, profile: dict, by_interests: bool):
+        candidates = follow_graph.friends_of_friends(profile["username"], settings.RECOMMENDATION_CANDIDATES)
+        if not candidates:
+            return []
+
+        # Also drops candidates whose profile no longer exists.
+        interests = profile["interests"] if by_interests else []
+        shared = await AsyncProfileRepository.get_shared_interests(db, [username for username, _ in candidates], interests)
+        recommendations = [
+            {"username": username, "mutual_follows": count, "shared_interests": shared[username], "score": count + shared[username]}
+            for username, count in candidates
+            if username in shared
+        ]
+        recommendations.sort(key=lambda item: (-item["score"], -item["mutual_follows"], item["username"]))
+        return recommendations[:settings.RECOMMENDATION_MAX_LIMIT]
+
+    async def get_verified_users(self, db, limit, after=None):
+        logger.debug("Getting verified users")
+        return await AsyncProfileRepository.get_verified_usernames_page(db, limit, after)
+
+    async def get_leaderboard(self, db: AsyncSession, board: str, verified: bool, limit: int, after: str = None):
+        logger.debug("Getting %s leaderboard", board)
+        return await AsyncProfileRepository.get_leaderboard_page(db, board, verified, limit, after)
+
+    async def rebuild_follow_counts(self, db: AsyncSession):
+        logger.info("Rebuilding follow counts")
+        return await AsyncProfileRepository.rebuild_follow_counts(db)
+
+    async def export_profiles(self, db: AsyncSession, batch_size: int):
+        logger.debug("Exporting profiles")
+        profiles = await AsyncProfileRepository.stream_profiles(db, batch_size)
+        return ({**profile, "interests": profile["interests"] or []} async for profile in profiles)
+
+    async def export_follows(self, db: AsyncSession, batch_size: int):
+        logger.debug("Exporting follows")
+        return await AsyncProfileRepository.stream_follows(db, batch_size)
+
+
+def _profile_dict(profile) -> dict:
+    profile_dict = {attribute.key: getattr(profile, attribute.key) for attribute in profile.__mapper__.column_attrs}
+    profile_dict["interests"] = list(profile.interests)
+    return profile_dict
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+class AuthServiceUnavailableError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast after consecutive failures and lets a single trial call
+    through once the reset timeout has passed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be made right now.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Let another trial call through if the current one ended without a
+        recorded outcome, for example because it was cancelled.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class AuthClient:
+    """
+    Client for the auth service backed by a long-lived connection pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        breaker: CircuitBreaker,
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.breaker = breaker
+        self._client = None
+        self._loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the event loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_stale_client(self._client, self._loop)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    @staticmethod
+    def _close_stale_client(client: httpx.AsyncClient, loop):
+        # The client can only be closed on its own loop; the connections of
+        # a closed loop are already gone with it.
+        if loop.is_closed():
+            logger.info("Dropping auth client of a closed event loop")
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def get_email_from_token(self, token: str):
+        """
+        Get the email of the user that owns the token.
+        """
+        if not self.breaker.allow_request():
+            raise AuthServiceUnavailableError("Auth service circuit is open")
+
+        try:
+            response = await self._get_client().request(
+                "GET",
+                self.base_url + "/auth/get-email-from-token",
+                headers={"Content-Type": "application/json"},
+                json={"token": token},
+            )
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            logger.error("Error calling auth service: %r", e)
+            raise AuthServiceUnavailableError(f"Auth service request failed: {e!r}")
+        except BaseException:
+            # Any other error or a cancellation must not leave a half-open
+            # breaker waiting for a trial that will never report back.
+            self.breaker.release_trial()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise AuthServiceUnavailableError(f"Auth service returned {response.status_code}")
+
+        self.breaker.record_success()
+        if response.status_code != 200:
+            raise InvalidTokenError("Invalid token")
+        return response.json().get("email")
+
+    async def get_json(self, url: str) -> dict:
+        """
+        Fetch a JSON document, such as the auth service signing keys.
+        """
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        """
+        Close the pooled connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+
+import jwt
+
+from services.auth_client import InvalidTokenError
+
+logger = logging.getLogger(__name__)
+
+# Errors that prove a token is invalid, as opposed to ones we cannot judge locally.
+_REJECTING_ERRORS = (
+    jwt.ExpiredSignatureError,
+    jwt.ImmatureSignatureError,
+    jwt.InvalidSignatureError,
+    jwt.InvalidAudienceError,
+    jwt.InvalidIssuerError,
+    jwt.MissingRequiredClaimError,
+)
+
+
+class JWKSCache:
+    """
+    Signing keys of the auth service, refreshed in the background.
+    """
+
+    def __init__(self, fetch_jwks, refresh_interval: float, min_refresh_interval: float, clock=time.monotonic):
+        self._fetch_jwks = fetch_jwks
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._clock = clock
+        self._keys = {}
+        self._refreshed_at = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def refresh(self):
+        """
+        Fetch the key set and replace the cached keys.
+        """
+        jwks = jwt.PyJWKSet.from_dict(await self._fetch_jwks())
+        self._keys = {key.key_id: key for key in jwks.keys}
+        self._refreshed_at = self._clock()
+        logger.info("Loaded %s signing keys", len(self._keys))
+
+    async def get_key(self, key_id: str):
+        """
+        Get a signing key by id, refreshing once if it is unknown.
+        """
+        key = self._keys.get(key_id)
+        if key is not None:
+            return key
+
+        async with self._lock:
+            key = self._keys.get(key_id)
+            recently_refreshed = (
+                self._refreshed_at is not None
+                and self._clock() - self._refreshed_at < self.min_refresh_interval
+            )
+            if key is None and not recently_refreshed:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error("Error refreshing signing keys: %r", e)
+                key = self._keys.get(key_id)
+        return key
+
+    async def _refresh_periodically(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing signing keys: %r", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """
+        Start refreshing the keys in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def stop(self):
+        """
+        Stop the background refresh.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class LocalTokenVerifier:
+    """
+    Verifies signed tokens in-process and reads the email claim.
+    """
+
+    def __init__(self, jwks: JWKSCache, algorithms: list, email_claim: str, audience: str = None, issuer: str = None):
+        self.jwks = jwks
+        self.algorithms = algorithms
+        self.email_claim = email_claim
+        self.audience = audience
+        self.issuer = issuer
+
+    async def get_email(self, token: str):
+        """
+        Get the email from a token, or None if it cannot be verified locally.
+        Raises InvalidTokenError if the token is provably invalid.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError:
+            return None
+
+        key = await self.jwks.get_key(header.get("kid"))
+        if key is None:
+            return None
+
+        try:
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                # Tokens without an expiry would stay valid forever.
+                options={"verify_aud": self.audience is not None, "require": ["exp"]},
+            )
+        except _REJECTING_ERRORS as e:
+            raise InvalidTokenError(str(e))
+        except jwt.PyJWTError as e:
+            logger.debug("Token could not be verified locally: %r", e)
+            return None
+
+        return claims.get(self.email_claim)
@@ -0,0 +1,222 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StatementCounter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = {labels: self._copy(value) for labels, value in self._values.items()}
+        for labels, value in sorted(values.items()):
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+    def _samples(self, labels, value) -> list:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, labels=(), value=0):
+        """
+        Set the total of a count kept elsewhere.
+        """
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, labels=(), value=0):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram; each label set keeps one count per bucket, a sum
+    and a count.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels=(), value=0.0):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _copy(self, value):
+        counts, total, count = value
+        return list(counts), total, count
+
+    def _samples(self, labels, value) -> list:
+        counts, total, count = value
+        samples, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = 'le="' + _number(bound) + '"'
+            samples.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+        samples.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+        samples.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return samples
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+db_queries = registry.counter("db_queries_total", "Database statements executed.")
+db_query_duration = registry.histogram("db_query_duration_seconds", "Time spent executing database statements.")
+auth_service_duration = registry.histogram("auth_service_request_duration_seconds", "Time spent in calls to the auth service.")
+
+
+def route_template(scope) -> str:
+    """
+    The path template of the route that handled a request, with the prefix
+    of an included router when the route only knows its own path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = scope["path"]
+    for start in range(len(path)):
+        if (start == 0 or path[start] == "/") and route.path_regex.match(path[start:]):
+            return path[:start] + route.path
+    return route.path
+
+
+class RequestStats:
+    """
+    Database statements and auth time spent on behalf of one request, and
+    whether its DEBUG logs were sampled.
+    """
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.debug_sampled = None
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.auth_seconds = None
+        self.statements = StatementCounter()
+        self._route = None
+
+    def route(self) -> str:
+        """
+        The route template of the request, once it is matched.
+        """
+        if self._route is None:
+            if "route" not in self.scope:
+                return "unmatched"
+            self._route = route_template(self.scope)
+        return self._route
+
+
+# Set by the request metrics middleware. Sync handlers run in worker threads
+# with a copy of the context, which still refers to the same RequestStats.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+def observe_auth(seconds: float):
+    """
+    Add time spent authenticating to the current request.
+    """
+    stats = current_request.get()
+    if stats is not None:
+        stats.auth_seconds = (stats.auth_seconds or 0.0) + seconds
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    seconds = time.perf_counter() - context.query_started_at
+    db_queries.inc()
+    db_query_duration.observe((), seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += seconds
+        stats.statements[statement] += 1
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs a blocking function in a worker thread every interval seconds, in the
+    background of the running event loop.
+    """
+
+    def __init__(self, name: str, fn, interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._task = None
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.fn)
+            except Exception as e:
+                logger.error("Error running %s: %r", self.name, e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """
+        Start running the function in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run_periodically())
+
+    async def stop(self):
+        """
+        Stop the background runs.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,66 @@
+import logging
+import re
+from collections import Counter
+
+from configs.env import settings
+
+logger = logging.getLogger(__name__)
+
+# A parenthesized list of bound parameters, in any DBAPI paramstyle.
+_PARAMETER = r"\s*(?:%\(\w+\)s|%s|\$\d+|\?|:\w+)\s*"
+_PARAMETER_LIST = re.compile(rf"\({_PARAMETER}(?:,{_PARAMETER})*\)")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """
+    The statement with its parameter lists collapsed, so that IN lists of
+    different lengths count as the same statement.
+    """
+    return _PARAMETER_LIST.sub("(...)", " ".join(statement.split()))
+
+
+class QueryBudget:
+    """
+    How many statements a request may issue, by default and per route, and
+    how many times it may repeat the same statement before that looks like
+    an N+1 loop. Strict budgets raise instead of logging a warning.
+    """
+
+    def __init__(self, default_limit: int, repeat_limit: int, strict: bool = False):
+        self.default_limit = default_limit
+        self.repeat_limit = repeat_limit
+        self.strict = strict
+        self.limits = {}
+
+    def limit_for(self, method: str, route: str) -> int:
+        return self.limits.get((method, route), self.default_limit)
+
+    def check(self, method: str, route: str, queries: int, statements: Counter) -> list:
+        """
+        Get the problems with the statements of a request, given their count
+        and how many times each statement ran.
+        """
+        problems = []
+        limit = self.limit_for(method, route)
+        if limit is not None and queries > limit:
+            problems.append(f"{method} {route} issued {queries} statements, over its budget of {limit}")
+
+        shapes = Counter()
+        for statement, count in statements.items():
+            shapes[statement_shape(statement)] += count
+        for shape, count in shapes.items():
+            if count > self.repeat_limit:
+                problems.append(f"{method} {route} repeated a statement {count} times: {shape[:200]}")
+
+        for problem in problems:
+            logger.warning(problem)
+        if problems and self.strict:
+            raise QueryBudgetExceeded("; ".join(problems))
+        return problems
+
+
+query_budget = QueryBudget(settings.QUERY_BUDGET, settings.QUERY_REPEAT_LIMIT, settings.QUERY_BUDGET_STRICT)
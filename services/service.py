@@ -4,190 +4,326 @@ import requests
 from sqlalchemy.orm import Session
 
 from repositories.repository import ProfileRepository
+from configs.env import settings
+from repositories.follow_graph import follow_graph, recommendation_cache
+from repositories.profile_cache import profile_cache
 from schemas.schema import ProfileCreate
+from services.singleflight import SingleFlight
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+profile_loads = SingleFlight()
+
 class ProfileService:
 
     def __init__(self, auth_service_url: str):
         self.auth_service_url = auth_service_url
 
     def create_profile(self, db: Session, profile_data: ProfileCreate, email: str):
-        logger.info(f"Creating profile with data {profile_data.model_dump()}")
+        logger.debug("Creating profile %s", profile_data.username)
         existing_profile = ProfileRepository.get_by_email(db, email)
         if existing_profile:
-            logger.error(f"Profile for email {email} already exists.")
+            logger.error("Profile for email %s already exists.", email)
             raise Exception(f"Profile for email {email} already exists.")
-        logger.info(f"Creating profile for email {email}")
+        logger.debug("Creating profile for email %s", email)
         return ProfileRepository.create_profile(db, profile_data, email)
     
-    def get_profile(self, db: Session, email: str):
-        logger.info(f"Getting profile")
-        profile = ProfileRepository.get_by_email(db, email)
-        profile = profile.__dict__
-        profile["interests"] = profile.get("interests", "").split(",")
+    def _read_through(self, db: Session, field: str, key: str, load):
+        """
+        Get a profile dict by username or email from the profile cache, loading
+        it with load on a miss.
+        """
+        profile = profile_cache.get(field, key)
+        if profile is not None:
+            logger.debug("Profile for %s %s served from cache", field, key)
+            return profile
+
+        # Concurrent misses for the same profile share one query and one result.
+        profile = profile_loads.do((field, key), lambda: self._load_profile(db, field, key, load))
+        return dict(profile)
+
+    def _load_profile(self, db: Session, field: str, key: str, load):
+        generation = profile_cache.generation
+        profile = load(db, key)
+
         if not profile:
-            logger.error(f"Profile for email {email} not found.")
-            raise Exception(f"Profile for email {email} not found.")
-        logger.info(f"Profile for email {email} retrieved")
+            logger.error("Profile for %s %s not found.", field, key)
+            raise Exception(f"Profile for {field} {key} not found.")
+
+        profile = _profile_dict(profile)
+        profile_cache.set(profile, generation)
+        logger.debug("Profile for %s %s retrieved", field, key)
         return profile
+
+    def get_profile(self, db: Session, email: str):
+        logger.debug("Getting profile")
+        return self._read_through(db, "email", email, ProfileRepository.get_by_email)
     
     def update_profile(self, db: Session, profile_data: ProfileCreate, email: str):
-        logger.info(f"Updating profile with data {profile_data.model_dump()}")
+        logger.debug("Updating profile %s", profile_data.username)
         profile = ProfileRepository.get_by_email(db, email)
         if not profile:
-            logger.error(f"Profile for email {email} not found.")
+            logger.error("Profile for email %s not found.", email)
             raise Exception(f"Profile for email {email} not found.")
-        logger.info(f"Updating profile for email {email}")
+        logger.debug("Updating profile for email %s", email)
         return ProfileRepository.update_profile(db, profile, profile_data)
     
     def delete_profile(self, db: Session, email: str):
-        logger.info(f"Deleting profile")
+        logger.debug("Deleting profile")
         profile = ProfileRepository.get_by_email(db, email)
         if not profile:
-            logger.error(f"Profile for email {email} not found.")
+            logger.error("Profile for email %s not found.", email)
             raise Exception(f"Profile for email {email} not found.")
-        logger.info(f"Deleting profile for email {email}")
+        logger.debug("Deleting profile for email %s", email)
         return ProfileRepository.delete_profile(db, profile)
     
-    def get_all_usernames(self, db: Session):
-        logger.info(f"Getting all usernames")
-        return ProfileRepository.get_all_usernames(db)
+    def get_all_usernames(self, db: Session, limit: int, after: str = None):
+        logger.debug("Getting all usernames")
+        return ProfileRepository.get_usernames_page(db, limit, after)
     
     def get_profile_by_username(self, db: Session, username: str):
-        logger.info(f"Getting profiles by username {username}")
-        profile =  ProfileRepository.get_profile_by_username(db, username)
-
-        if not profile:
-            logger.error(f"Profile for username {username} not found.")
-            raise Exception(f"Profile for username {username} not found.")
-        
-        profile = profile.__dict__
-        profile["interests"] = profile.get("interests", "").split(",")
-        logger.info(f"Profile for username {username} retrieved")
-        return profile
+        logger.debug("Getting profiles by username %s", username)
+        return self._read_through(db, "username", username, ProfileRepository.get_profile_by_username)
 
     def get_profile_by_email(self, db: Session, email: str):
-        logger.info(f"Getting profiles by email {email}")
-        profile =  ProfileRepository.get_by_email(db, email)
-
-        if not profile:
-            logger.error(f"Profile for email {email} not found.")
-            raise Exception(f"Profile for email {email} not found.")
-        
-        profile = profile.__dict__
-        profile["interests"] = profile.get("interests", "").split(",")
-        logger.info(f"Profile for email {email} retrieved")
-        return profile
+        logger.debug("Getting profiles by email %s", email)
+        return self._read_through(db, "email", email, ProfileRepository.get_by_email)
+    
+    def get_follow_counts(self, db: Session, username: str):
+        logger.debug("Getting follow counts of %s", username)
+        profile = self.get_profile_by_username(db, username)
+        return {key: profile[key] for key in ("username", "followers_count", "following_count")}
+    
+    def get_profiles_batch(self, db: Session, usernames: list = None, emails: list = None):
+        """
+        Get profiles by usernames or by emails with one query, in the order of
+        the input and with None for the ones not found.
+        """
+        field, keys = ("username", usernames) if usernames is not None else ("email", emails)
+        logger.debug("Getting %s profiles by %s", len(keys), field)
+        profiles = ProfileRepository.get_profiles_by(db, field, list(set(keys)))
+        by_key = {getattr(profile, field): profile for profile in profiles}
+        return [
+            _profile_dict(by_key[key]) if key in by_key else None
+            for key in keys
+        ]
     
     def follow_user(self, db: Session, follower_email: str, followed: str):
-        logger.info(f"Following user {followed}")
+        logger.debug("Following user %s", followed)
 
-        followed_profile = ProfileRepository.get_profile_by_username(db, followed)
+        if ProfileRepository.follow_user(db, follower_email, followed):
+            return
 
-        if not followed_profile:
-            logger.error(f"Profile for username {followed} not found.")
+        follower_username, followed_exists = ProfileRepository.get_follow_participants(db, follower_email, followed)
 
+        if not followed_exists:
+            logger.error("Profile for username %s not found.", followed)
             raise Exception(f"User with username {followed} not found.")
-        
-        follower_username = ProfileRepository.get_by_email(db, follower_email).username
+
+        if follower_username is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
 
         if follower_username == followed:
-            logger.error(f"Cannot follow yourself.")
+            logger.error("Cannot follow yourself.")
             raise Exception(f"Cannot follow yourself.")
-        
-        all_followed = ProfileRepository.get_all_followed(db, follower_username)
-
-        if followed in all_followed:
-            logger.error(f"User with username {followed} is already followed by user with username {follower_username}")
-            raise Exception(f"User with username {followed} is already followed by user with username {follower_username}")
 
-
-        return ProfileRepository.follow_user(db, follower_username, followed)
+        logger.error("User with username %s is already followed by user with username %s", followed, follower_username)
+        raise Exception(f"User with username {followed} is already followed by user with username {follower_username}")
     
     def unfollow_user(self, db: Session, follower_email: str, followed: str):
-        logger.info(f"Unfollowing user {followed}")
+        logger.debug("Unfollowing user %s", followed)
+
+        if ProfileRepository.unfollow_user(db, follower_email, followed):
+            return
 
-        followed_profile = ProfileRepository.get_profile_by_username(db, followed)
+        follower_username, followed_exists = ProfileRepository.get_follow_participants(db, follower_email, followed)
 
-        if not followed_profile:
-            logger.error(f"Profile for username {followed} not found.")
+        if not followed_exists:
+            logger.error("Profile for username %s not found.", followed)
             raise Exception(f"User with username {followed} not found.")
-        
-        follower_username = ProfileRepository.get_by_email(db, follower_email).username
-        
-        all_followed = ProfileRepository.get_all_followed(db, follower_username)
 
-        if followed not in all_followed:
-            logger.error(f"User with username {followed} is not followed by user with username {follower_username}")
-            raise Exception(f"User with username {followed} is not followed by user with username {follower_username}")
+        if follower_username is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
 
-        return ProfileRepository.unfollow_user(db, follower_username, followed)
+        logger.error("User with username %s is not followed by user with username %s", followed, follower_username)
+        raise Exception(f"User with username {followed} is not followed by user with username {follower_username}")
     
-    def get_followed(self, db: Session, username: str, user_email: str):
-        logger.info(f"Getting followed")
+    def _batch_participants(self, db: Session, follower_email: str, usernames: list):
+        rows = ProfileRepository.get_batch_participants(db, follower_email, usernames)
+        follower = next((row.username for row in rows if row.is_follower), None)
+
+        if follower is None:
+            logger.error("Profile for email %s not found.", follower_email)
+            raise Exception(f"Profile for email {follower_email} not found.")
+
+        existing = {row.username for row in rows} & set(usernames)
+        return follower, existing
+
+    def follow_users(self, db: Session, follower_email: str, usernames: list):
+        """
+        Follow several users in one transaction, reporting a status for each username.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        logger.debug("Following %s users", len(usernames))
+        follower, existing = self._batch_participants(db, follower_email, usernames)
+        followed = ProfileRepository.follow_users(db, follower, list(existing)) if existing else set()
 
-        token_username = ProfileRepository.get_by_email(db, user_email).username
+        def status(username):
+            if username in followed:
+                return "followed"
+            if username not in existing:
+                return "not_found"
+            if username == follower:
+                return "self"
+            return "already_followed"
 
-        if token_username == username:
-            return ProfileRepository.get_all_followed(db, username)
-        else:
-            username_followed = ProfileRepository.get_all_followed(db, username)
-            token_username_followed = ProfileRepository.get_all_followed(db, token_username)
+        return [{"username": username, "status": status(username)} for username in usernames]
 
-            if token_username in username_followed and username in token_username_followed:
-                return username_followed
-            else:
-                raise Exception(f"User {token_username} is not authorized to view followed of user {username}")
+    def unfollow_users(self, db: Session, follower_email: str, usernames: list):
+        """
+        Unfollow several users in one transaction, reporting a status for each username.
+        """
+        usernames = list(dict.fromkeys(usernames))
+        logger.debug("Unfollowing %s users", len(usernames))
+        follower, existing = self._batch_participants(db, follower_email, usernames)
+        unfollowed = ProfileRepository.unfollow_users(db, follower, list(existing)) if existing else set()
+
+        def status(username):
+            if username in unfollowed:
+                return "unfollowed"
+            if username not in existing:
+                return "not_found"
+            return "not_followed"
+
+        return [{"username": username, "status": status(username)} for username in usernames]
     
-    def get_followers(self, db: Session, username: str, user_email: str):
-        logger.info(f"Getting followers")
+    def _authorize_view(self, db: Session, username: str, user_email: str, relation: str):
+        """
+        Users can see their own follow lists and those of users they mutually follow.
+        """
+        access = ProfileRepository.get_view_access(db, user_email, username)
 
-        token_username = ProfileRepository.get_by_email(db, user_email).username
+        if access is None:
+            logger.error("Profile for email %s not found.", user_email)
+            raise Exception(f"Profile for email {user_email} not found.")
 
-        if token_username == username:
-            return ProfileRepository.get_all_followers(db, username)
-        else:
-            username_followers = ProfileRepository.get_all_followers(db, username)
-            token_username_followers = ProfileRepository.get_all_followers(db, token_username)
+        token_username, mutual = access
 
-            if token_username in username_followers and username in token_username_followers:
-                return username_followers
-            else:
-                raise Exception(f"User {token_username} is not authorized to view followers of user {username}")
-            
-    def get_followers_with_time(self, db: Session, username: str, user_email: str):
-        logger.info(f"Getting followers with timestamp")
+        if token_username != username and not mutual:
+            raise Exception(f"User {token_username} is not authorized to view {relation} of user {username}")
 
-        token_username = ProfileRepository.get_by_email(db, user_email).username
+    def get_followed(self, db: Session, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followed")
+        self._authorize_view(db, username, user_email, "followed")
+        return ProfileRepository.get_followed_page(db, username, limit, after)
 
-        if token_username == username:
-            return ProfileRepository.get_all_followers_with_timestamp(db, username)
-        else:
-            username_followers = ProfileRepository.get_all_followers_with_timestamp(db, username)
-            token_username_followers = ProfileRepository.get_all_followers_with_timestamp(db, token_username)
+    def get_followed_emails(self, db: Session, username: str, user_email: str):
+        logger.debug("Getting followed emails")
+        self._authorize_view(db, username, user_email, "followed")
+        return ProfileRepository.get_followed_emails(db, username)
+    
+    def get_followers(self, db: Session, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followers")
+        self._authorize_view(db, username, user_email, "followers")
+        return ProfileRepository.get_followers_page(db, username, limit, after)
 
-            if token_username in username_followers and username in token_username_followers:
-                return username_followers
-            else:
-                raise Exception(f"User {token_username} is not authorized to view followers of user {username}")
+    def get_followers_with_time(self, db: Session, username: str, user_email: str, limit: int, after: str = None):
+        logger.debug("Getting followers with timestamp")
+        self._authorize_view(db, username, user_email, "followers")
+        return ProfileRepository.get_followers_with_timestamp_page(db, username, limit, after)
     
     def verify_user(self, db, username):
-        logger.info(f"Verifying user {username}")
+        logger.debug("Verifying user %s", username)
         return ProfileRepository.verify_user(db, username)
     
     def unverify_user(self, db, username):
-        logger.info(f"Unverifying user {username}")
+        logger.debug("Unverifying user %s", username)
         return ProfileRepository.unverify_user(db, username)
     
-    def get_all_users(self, db):
-        logger.info(f"Getting all users")
-        return ProfileRepository.get_all_users(db)
+    def get_all_users(self, db, limit, after=None):
+        logger.debug("Getting all users")
+        page = ProfileRepository.get_users_page(db, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+    
+    def autocomplete(self, db: Session, prefix: str, limit: int):
+        logger.debug("Autocompleting %s", prefix)
+        return ProfileRepository.autocomplete(db, prefix, limit)
+
+    def search_profiles(self, db: Session, query: str, verified: bool, location: str, limit: int, after: str = None):
+        logger.debug("Searching profiles for %s", query)
+        page = ProfileRepository.search_profiles_page(db, query, verified, location, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+    
+    def get_profiles_by_interest(self, db: Session, interest: str, limit: int, after: str = None):
+        logger.debug("Getting profiles with interest %s", interest)
+        page = ProfileRepository.get_profiles_with_interest_page(db, interest, limit, after)
+        return page._replace(items=[_profile_dict(profile) for profile in page.items])
+
+    def get_popular_interests(self, db: Session, limit: int):
+        logger.debug("Getting popular interests")
+        return ProfileRepository.get_popular_interests(db, limit)
+
+    def get_recommendations(self, db: Session, email: str, by_interests: bool, limit: int):
+        """
+        Suggest users followed by the users the user follows, scored by how
+        many of them follow each one and, with by_interests, by the number of
+        interests shared with the user.
+        """
+        profile = self.get_profile(db, email)
+        logger.debug("Getting recommendations for %s", profile['username'])
+        # The graph is loaded in the background at startup.
+        if not follow_graph.loaded:
+            logger.debug("Follow graph not loaded yet")
+            return []
+
+        key = (profile["username"], by_interests)
+        recommendations = recommendation_cache.get(key)
+        if recommendations is None:
+            recommendations = self._recommend(db, profile, by_interests)
+            recommendation_cache.set(key, recommendations)
+        return recommendations[:limit]
     
-    def get_verified_users(self, db):
-        logger.info(f"Getting verified users")
-        return ProfileRepository.get_verified_users(db)
+    def _recommend(self, db: Session, profile: dict, by_interests: bool):
+        candidates = follow_graph.friends_of_friends(profile["username"], settings.RECOMMENDATION_CANDIDATES)
+        if not candidates:
+            return []
 
+        # Also drops candidates whose profile no longer exists.
+        interests = profile["interests"] if by_interests else []
+        shared = ProfileRepository.get_shared_interests(db, [username for username, _ in candidates], interests)
+        recommendations = [
+            {"username": username, "mutual_follows": count, "shared_interests": shared[username], "score": count + shared[username]}
+            for username, count in candidates
+            if username in shared
+        ]
+        recommendations.sort(key=lambda item: (-item["score"], -item["mutual_follows"], item["username"]))
+        return recommendations[:settings.RECOMMENDATION_MAX_LIMIT]
     
+    def get_verified_users(self, db, limit, after=None):
+        logger.debug("Getting verified users")
+        return ProfileRepository.get_verified_usernames_page(db, limit, after)
+
+    def get_leaderboard(self, db: Session, board: str, verified: bool, limit: int, after: str = None):
+        logger.debug("Getting %s leaderboard", board)
+        return ProfileRepository.get_leaderboard_page(db, board, verified, limit, after)
+
+    def rebuild_follow_counts(self, db: Session):
+        logger.info("Rebuilding follow counts")
+        return ProfileRepository.rebuild_follow_counts(db)
+
+    def export_profiles(self, db: Session, batch_size: int):
+        logger.debug("Exporting profiles")
+        profiles = ProfileRepository.stream_profiles(db, batch_size)
+        return ({**profile, "interests": profile["interests"] or []} for profile in profiles)
+
+    def export_follows(self, db: Session, batch_size: int):
+        logger.debug("Exporting follows")
+        return ProfileRepository.stream_follows(db, batch_size)
+
+
+def _profile_dict(profile) -> dict:
+    profile_dict = {attribute.key: getattr(profile, attribute.key) for attribute in profile.__mapper__.column_attrs}
+    profile_dict["interests"] = list(profile.interests)
+    return profile_dict
@@ -0,0 +1,44 @@
+from services.query_budget import query_budget
+
+# Statements each route may issue per request, enforced on every request the
+# suite makes. Every route needs one, see test_query_budget.py.
+ROUTE_QUERY_BUDGETS = {
+    ("GET", "/"): 0,
+    ("GET", "/cache-stats"): 0,
+    ("GET", "/pool-stats"): 0,
+    ("GET", "/metrics"): 0,
+    # Lookup, insert, interests, then the refreshed profile with its interests.
+    ("POST", "/profiles/"): 5,
+    ("GET", "/profiles/"): 2,
+    # Lookup with interests, profile update, interest inserts and deletes, refresh.
+    ("PUT", "/profiles/"): 8,
+    ("DELETE", "/profiles/"): 4,
+    ("GET", "/profiles/all-usernames"): 1,
+    ("GET", "/profiles/by-username"): 2,
+    ("GET", "/profiles/by-email"): 2,
+    ("GET", "/profiles/counts"): 2,
+    ("POST", "/profiles/batch"): 2,
+    ("POST", "/profiles/follow"): 2,
+    ("DELETE", "/profiles/unfollow"): 2,
+    ("POST", "/profiles/follow/batch"): 2,
+    ("POST", "/profiles/unfollow/batch"): 2,
+    ("GET", "/profiles/followers"): 2,
+    ("GET", "/profiles/followers-with-time/"): 2,
+    ("GET", "/profiles/followed"): 2,
+    ("GET", "/profiles/followed-emails"): 2,
+    ("GET", "/profiles/recommendations"): 3,
+    ("PUT", "/profiles/verify"): 1,
+    ("PUT", "/profiles/unverify"): 1,
+    ("GET", "/profiles/get-all-users"): 2,
+    ("GET", "/profiles/verified-users"): 1,
+    ("GET", "/profiles/autocomplete"): 1,
+    ("GET", "/profiles/search"): 2,
+    ("GET", "/profiles/by-interest"): 2,
+    ("GET", "/profiles/interests/popular"): 1,
+    ("GET", "/profiles/leaderboard"): 1,
+    ("GET", "/profiles/export/profiles"): 1,
+    ("GET", "/profiles/export/follows"): 1,
+}
+
+query_budget.limits.update(ROUTE_QUERY_BUDGETS)
+query_budget.strict = True
@@ -0,0 +1,285 @@
+import asyncio
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+import jwt
+import pytest
+
+import controllers.authentication as authentication
+from controllers.authentication import get_user_from_token, token_cache
+from services.auth_client import AuthClient, CircuitBreaker
+from services.cache import TTLCache
+from services.jwt_verifier import JWKSCache, LocalTokenVerifier
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        token = json.loads(body or b"{}").get("token")
+        self.server.calls += 1
+        time.sleep(self.server.delay)
+
+        if token == "error":
+            status, payload = 500, {"detail": "Internal error"}
+        elif token and token.startswith("valid-"):
+            status, payload = 200, {"email": token[len("valid-"):] + "@example.com"}
+        else:
+            status, payload = 401, {"detail": "Invalid token"}
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_auth_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAuthHandler)
+    server.daemon_threads = True
+    server.block_on_close = False
+    server.calls = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def client(stub_auth_server, clock, monkeypatch):
+    client = AuthClient(
+        base_url=f"http://127.0.0.1:{stub_auth_server.server_port}",
+        connect_timeout=0.5,
+        read_timeout=0.2,
+        max_connections=10,
+        max_keepalive_connections=5,
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: clock[0]),
+    )
+    monkeypatch.setattr(authentication, "auth_client", client)
+    token_cache.clear()
+    yield client
+    token_cache.clear()
+
+
+def run(*tokens):
+    """
+    Resolve tokens in order on one event loop, returning emails or HTTP status codes.
+    """
+    async def resolve():
+        results = []
+        for token in tokens:
+            try:
+                results.append(await get_user_from_token(token))
+            except HTTPException as e:
+                results.append(e.status_code)
+        await authentication.auth_client.aclose()
+        return results
+    return asyncio.run(resolve())
+
+
+def test_valid_token_is_cached(client, stub_auth_server):
+    assert run("valid-john", "valid-john") == ["john@example.com", "john@example.com"]
+    assert stub_auth_server.calls == 1
+    assert token_cache.stats()["hits"] == 1
+
+def test_invalid_token_is_negatively_cached(client, stub_auth_server):
+    assert run("invalid", "invalid") == [401, 401]
+    assert stub_auth_server.calls == 1
+
+def test_auth_service_error_is_not_cached(client, stub_auth_server):
+    assert run("error") == [503]
+    assert run("error") == [503]
+    assert stub_auth_server.calls == 2
+
+def test_concurrent_lookups_share_one_call(client, stub_auth_server):
+    stub_auth_server.delay = 0.1
+
+    async def resolve_concurrently():
+        emails = await asyncio.gather(*[get_user_from_token("valid-john") for _ in range(5)])
+        await authentication.auth_client.aclose()
+        return emails
+
+    assert asyncio.run(resolve_concurrently()) == ["john@example.com"] * 5
+    assert stub_auth_server.calls == 1
+    assert len(authentication.token_lookups) == 0
+
+def test_concurrent_invalid_lookups_share_one_call(client, stub_auth_server):
+    stub_auth_server.delay = 0.1
+
+    async def resolve_concurrently():
+        results = await asyncio.gather(*[get_user_from_token("invalid") for _ in range(5)], return_exceptions=True)
+        await authentication.auth_client.aclose()
+        return [result.status_code for result in results]
+
+    assert asyncio.run(resolve_concurrently()) == [401] * 5
+    assert stub_auth_server.calls == 1
+
+def test_slow_auth_service_times_out(client, stub_auth_server):
+    stub_auth_server.delay = 1
+
+    start = time.monotonic()
+    assert run("valid-john") == [503]
+    assert time.monotonic() - start < 1
+
+def test_circuit_opens_after_failures(client, stub_auth_server):
+    stub_auth_server.delay = 1
+
+    start = time.monotonic()
+    assert run("valid-a", "valid-b", "valid-c", "valid-d") == [503, 503, 503, 503]
+    assert time.monotonic() - start < 1
+    assert stub_auth_server.calls == 2
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+def test_circuit_recovers_after_reset_timeout(client, stub_auth_server, clock):
+    stub_auth_server.delay = 1
+    assert run("valid-a", "valid-b") == [503, 503]
+
+    stub_auth_server.delay = 0
+    clock[0] = 10
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert run("valid-john") == ["john@example.com"]
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_trial_reopens_circuit(client, stub_auth_server, clock):
+    assert run("error", "error") == [503, 503]
+
+    clock[0] = 10
+    assert run("error", "valid-john") == [503, 503]
+    assert stub_auth_server.calls == 3
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+def test_cancelled_trial_lets_next_trial_through(client, stub_auth_server, clock):
+    assert run("error", "error") == [503, 503]
+
+    async def cancelled_trial():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get_email_from_token("valid-a"), 0.05)
+        await client.aclose()
+
+    clock[0] = 10
+    stub_auth_server.delay = 0.1
+    asyncio.run(cancelled_trial())
+
+    stub_auth_server.delay = 0
+    assert run("valid-john") == ["john@example.com"]
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_client_of_previous_loop_is_closed(client, stub_auth_server):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        assert asyncio.run_coroutine_threadsafe(client.get_email_from_token("valid-a"), loop).result() == "a@example.com"
+        stale = client._client
+
+        assert run("valid-john") == ["john@example.com"]
+        deadline = time.monotonic() + 1
+        while not stale.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stale.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+@pytest.fixture
+def signing_keys():
+    return {"key-1": rsa.generate_private_key(public_exponent=65537, key_size=2048)}
+
+
+@pytest.fixture
+def verifier(client, signing_keys, monkeypatch):
+    async def fetch_jwks():
+        fetch_jwks.calls += 1
+        return {"keys": [
+            {**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key())), "kid": kid, "use": "sig", "alg": "RS256"}
+            for kid, key in signing_keys.items()
+        ]}
+    fetch_jwks.calls = 0
+
+    verifier = LocalTokenVerifier(
+        jwks=JWKSCache(fetch_jwks=fetch_jwks, refresh_interval=300, min_refresh_interval=0),
+        algorithms=["RS256"],
+        email_claim="email",
+    )
+    verifier.fetch_jwks = fetch_jwks
+    monkeypatch.setattr(authentication, "token_verifier", verifier)
+    return verifier
+
+
+def sign(signing_keys, kid, email, expires_in=60):
+    claims = {"email": email, "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)}
+    return jwt.encode(claims, signing_keys[kid], algorithm="RS256", headers={"kid": kid})
+
+
+def test_local_mode_verifies_without_auth_service(verifier, signing_keys, stub_auth_server):
+    token = sign(signing_keys, "key-1", "john@example.com")
+
+    assert run(token, token) == ["john@example.com", "john@example.com"]
+    assert stub_auth_server.calls == 0
+    assert verifier.fetch_jwks.calls == 1
+
+def test_local_mode_rejects_expired_token(verifier, signing_keys, stub_auth_server):
+    assert run(sign(signing_keys, "key-1", "john@example.com", expires_in=-60)) == [401]
+    assert stub_auth_server.calls == 0
+
+def test_local_mode_rejects_token_without_expiry(verifier, signing_keys, stub_auth_server):
+    token = jwt.encode({"email": "john@example.com"}, signing_keys["key-1"], algorithm="RS256", headers={"kid": "key-1"})
+    assert run(token) == [401]
+    assert stub_auth_server.calls == 0
+
+def test_local_mode_rejects_token_signed_with_other_key(verifier, signing_keys, stub_auth_server):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    token = jwt.encode({"email": "john@example.com"}, other_key, algorithm="RS256", headers={"kid": "key-1"})
+
+    assert run(token) == [401]
+    assert stub_auth_server.calls == 0
+
+def test_local_mode_refreshes_keys_for_unknown_key_id(verifier, signing_keys):
+    assert run(sign(signing_keys, "key-1", "john@example.com")) == ["john@example.com"]
+
+    signing_keys["key-2"] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    assert run(sign(signing_keys, "key-2", "jane@example.com")) == ["jane@example.com"]
+    assert verifier.fetch_jwks.calls == 2
+
+def test_local_mode_falls_back_to_auth_service(verifier, stub_auth_server):
+    assert run("valid-john") == ["john@example.com"]
+    assert stub_auth_server.calls == 1
+
+def test_ttl_cache_expires_entries():
+    now = [0.0]
+    cache = TTLCache(max_size=10, ttl=5, clock=lambda: now[0])
+    cache.set("token", "user@example.com")
+    assert cache.get("token") == "user@example.com"
+    now[0] = 5.0
+    assert cache.get("token") is None
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,158 @@
+import io
+import json
+import logging
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import configs.log
+from configs.env import settings
+from configs.log import configure_logging, log_records_dropped, parse_sample_rates, stop_logging
+from controllers.metrics import RequestMetricsMiddleware
+
+logger = logging.getLogger("tests.logging")
+
+app = FastAPI()
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.get("/logging-test/items/{item}")
+def item(item: str):
+    for step in range(3):
+        logger.debug("Step %s of %s", step, item)
+    logger.info("Served %s", item)
+    return {}
+
+
+@app.get("/logging-test/quiet")
+def quiet():
+    logger.debug("Quiet debug")
+    logger.info("Quiet info")
+    return {}
+
+
+client = TestClient(app)
+
+
+@pytest.fixture()
+def output(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_LEVEL", "DEBUG")
+    monkeypatch.setattr(settings, "LOG_FORMAT", "json")
+    monkeypatch.setattr(settings, "LOG_DEBUG_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "LOG_DEBUG_ROUTE_SAMPLE_RATES", "")
+    stream = io.StringIO()
+
+    def records():
+        stop_logging()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield stream, records
+    stop_logging()
+    monkeypatch.undo()
+    configure_logging()
+
+
+def messages(records, name="tests.logging"):
+    return [record["message"] for record in records if record["logger"] == name]
+
+
+def test_json_records_carry_the_request(output):
+    stream, records = output
+    configure_logging(stream)
+    client.get("/logging-test/items/a")
+    logger.warning("Outside %s", "requests")
+
+    served, outside = [record for record in records() if record["logger"] == "tests.logging" and record["level"] != "DEBUG"]
+    assert served["message"] == "Served a"
+    assert (served["method"], served["route"]) == ("GET", "/logging-test/items/{item}")
+    assert served["logger"] == "tests.logging"
+    assert served["time"].endswith("+00:00")
+    assert outside["message"] == "Outside requests"
+    assert "route" not in outside
+
+def test_arguments_and_exceptions_are_rendered_when_logged(output):
+    stream, records = output
+    configure_logging(stream)
+    items = ["a"]
+    logger.info("Items %s", items)
+    items.append("b")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+
+    logged, failed = records()
+    assert logged["message"] == "Items ['a']"
+    assert failed["message"] == "Failed"
+    assert "ValueError: boom" in failed["exception"]
+
+def test_level(output, monkeypatch):
+    stream, records = output
+    monkeypatch.setattr(settings, "LOG_LEVEL", "INFO")
+    configure_logging(stream)
+    client.get("/logging-test/items/a")
+    assert messages(records()) == ["Served a"]
+
+def test_text_format(output, monkeypatch):
+    stream, _ = output
+    monkeypatch.setattr(settings, "LOG_FORMAT", "text")
+    configure_logging(stream)
+    logger.info("Plain %s", "text")
+    stop_logging()
+    assert stream.getvalue().rstrip().endswith("INFO tests.logging: Plain text")
+
+def test_debug_logs_are_sampled_by_route(output, monkeypatch):
+    stream, records = output
+    monkeypatch.setattr(settings, "LOG_DEBUG_ROUTE_SAMPLE_RATES", "GET /logging-test/quiet=0")
+    configure_logging(stream)
+    client.get("/logging-test/quiet")
+    client.get("/logging-test/items/a")
+    assert messages(records()) == ["Quiet info", "Step 0 of a", "Step 1 of a", "Step 2 of a", "Served a"]
+
+def test_sampling_keeps_or_drops_all_debug_logs_of_a_request(output, monkeypatch):
+    stream, records = output
+    monkeypatch.setattr(settings, "LOG_DEBUG_SAMPLE_RATE", 0.5)
+    configure_logging(stream)
+    for item in range(20):
+        client.get(f"/logging-test/items/{item}")
+
+    steps = {}
+    for message in messages(records()):
+        if message.startswith("Step"):
+            item = message.split()[-1]
+            steps[item] = steps.get(item, 0) + 1
+    assert set(steps.values()) == {3}
+    assert 0 < len(steps) < 20
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("GET /profiles/by-username=0.01, POST /profiles/=1") == {
+        "GET /profiles/by-username": 0.01,
+        "POST /profiles/": 1.0,
+    }
+
+def test_logging_does_not_block_on_a_slow_output(output, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_QUEUE_SIZE", 10)
+    released = threading.Event()
+
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            released.wait()
+            return super().write(text)
+
+    stream = SlowStream()
+    configure_logging(stream)
+    dropped = log_records_dropped._values.get((), 0)
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info("Record %s", i)
+    assert time.perf_counter() - start < 0.5
+    assert log_records_dropped._values[()] - dropped >= 89
+
+    released.set()
+    stop_logging()
+    assert configs.log._listener is None
+    assert "Record 0" in stream.getvalue()